@@ -3,10 +3,86 @@
 支持 ChatGPT-4o-latest 模型
 """
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Optional, List, Dict, Union, Any
 import json
+import random
 import time
 
+# orjson的C實現比stdlib json快3-5倍，對小dict和SSE逐幀解析尤其明顯；
+# 未安裝時回退到stdlib
+try:
+    import orjson
+    _json_dumps = orjson.dumps  # 直接返回bytes
+    _json_loads = orjson.loads
+
+    def _parse_response(response):
+        return orjson.loads(response.content)
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    _json_loads = json.loads
+
+    def _parse_response(response):
+        return response.json()
+
+# httpx用於異步流式接口（單個事件循環可同時復用幾十條流）；
+# 未安裝時同步接口不受影響
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# 只有裝了brotli解碼器才能在Accept-Encoding裡聲明br，
+# 否則服務端真按br壓縮時requests解不開響應體
+try:
+    import brotli  # noqa: F401
+    _ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        _ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        _ACCEPT_ENCODING = "gzip, deflate"
+
+# 惰性創建的共享AsyncClient：keep-alive連接池 + 盡可能啟用HTTP/2多路復用
+_ACLIENT = None
+
+# httpx 0.14起連接池參數才叫Limits/limits=、請求體才叫content=；
+# googletrans鎖定的0.13.x用PoolLimits/pool_limits=和data=
+_HTTPX_MODERN = httpx is not None and getattr(httpx, 'Limits', None) is not None
+
+
+def _get_aclient():
+    """獲取共享的httpx.AsyncClient（首次調用創建，之後復用連接池）"""
+    global _ACLIENT
+    if _ACLIENT is None:
+        if httpx is None:
+            raise Exception("異步流式接口需要安裝 httpx: pip install httpx")
+        if _HTTPX_MODERN:
+            pool_kwargs = {'limits': httpx.Limits(max_keepalive_connections=32)}
+        else:
+            pool_kwargs = {'pool_limits': httpx.PoolLimits(soft_limit=32)}
+        try:
+            _ACLIENT = httpx.AsyncClient(http2=True, **pool_kwargs)
+        except ImportError:
+            # 未安裝h2時退回HTTP/1.1
+            _ACLIENT = httpx.AsyncClient(**pool_kwargs)
+    return _ACLIENT
+
+# 模塊級共享Session：帶keep-alive連接池，重複調用同一API主機時
+# 跳過TCP+TLS握手（每次握手約數百ms）。Authorization仍按調用傳遞，
+# 不綁定在Session上，多租戶調用互不影響
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0))
+
+
+def close():
+    """關閉共享Session的連接池（進程退出前調用）"""
+    _SESSION.close()
+
 
 def chat_completion(
     messages: List[Dict[str, str]],
@@ -66,10 +142,12 @@ def chat_completion(
     # 構建請求 URL
     url = f"{base_url}/chat/completions"
     
-    # 構建請求頭
+    # 構建請求頭（裝了brotli時額外聲明br：JSON響應壓縮率5-20倍，
+    # 慢鏈路上明顯降低TTFT；requests默認只發gzip, deflate）
     headers = {
         "Content-Type": "application/json",
         "Accept": "application/json",
+        "Accept-Encoding": _ACCEPT_ENCODING,
         "Authorization": f"Bearer {api_key}"
     }
     
@@ -101,46 +179,67 @@ def chat_completion(
     if user is not None:
         payload["user"] = user
     
-    # 驗證 messages 格式
+    # 驗證 messages 格式（逐條檢查；循環本身很便宜，不值得為省它引入緩存）
     if not messages or not isinstance(messages, list):
         raise ValueError("messages 必須是非空列表")
-    
+
     for msg in messages:
         if not isinstance(msg, dict):
             raise ValueError("messages 中的每個元素必須是字典")
         if "role" not in msg or "content" not in msg:
             raise ValueError("messages 中的每個字典必須包含 'role' 和 'content' 字段")
     
-    # 重試邏輯
+    # 重試邏輯：全抖動指數退避（sleep在[0, base*2^attempt]間均勻取值，上限max_delay），
+    # 避免多個客戶端同步重試造成的驚群效應
+    base_delay = retry_delay
+    max_delay = 30.0
+    rng = random.Random()  # 每次調用獨立的RNG，避免全局random的鎖競爭
+    # 可重試的HTTP狀態碼：限流和瞬時服務端錯誤；其他4xx視為永久錯誤
+    retryable_status = {429, 500, 502, 503, 504}
+
     last_exception = None
     for attempt in range(retry_count):
         try:
-            # 發送請求
-            response = requests.post(
+            # 發送請求（走共享連接池；payload提前用orjson序列化為bytes）
+            response = _SESSION.post(
                 url,
                 headers=headers,
-                json=payload,
+                data=_json_dumps(payload),
                 timeout=timeout
             )
-            
+
             # 檢查 HTTP 狀態碼
             response.raise_for_status()
-            
+
             # 解析 JSON 響應
-            result = response.json()
+            result = _parse_response(response)
             return result
             
         except requests.exceptions.Timeout:
             last_exception = Exception(f"請求超時（超過 {timeout} 秒）")
             if attempt < retry_count - 1:
-                print(f"⚠ 請求超時，正在重試 ({attempt + 1}/{retry_count})...")
-                time.sleep(retry_delay)
+                sleep_s = rng.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+                print(f"⚠ 請求超時，{sleep_s:.1f} 秒後重試 ({attempt + 1}/{retry_count})...")
+                time.sleep(sleep_s)
             else:
                 raise last_exception
-        
+
         except requests.exceptions.HTTPError as e:
-            # HTTP 錯誤（如 401, 403, 404 等）通常不需要重試
-            error_msg = f"HTTP 錯誤: {e.response.status_code}"
+            status_code = e.response.status_code
+            if status_code in retryable_status and attempt < retry_count - 1:
+                # 限流/瞬時5xx可重試；服務端給出Retry-After時優先遵循
+                try:
+                    sleep_s = float(e.response.headers.get("Retry-After", 0))
+                except (TypeError, ValueError):
+                    sleep_s = 0
+                if sleep_s <= 0:
+                    sleep_s = rng.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+                last_exception = e
+                print(f"⚠ HTTP {status_code}，{sleep_s:.1f} 秒後重試 ({attempt + 1}/{retry_count})...")
+                time.sleep(sleep_s)
+                continue
+            # 其他 HTTP 錯誤（如 401, 403, 404 等）不需要重試
+            error_msg = f"HTTP 錯誤: {status_code}"
             try:
                 error_detail = e.response.json()
                 if "error" in error_detail:
@@ -148,12 +247,13 @@ def chat_completion(
             except:
                 error_msg += f" - {e.response.text}"
             raise Exception(error_msg)
-        
+
         except requests.exceptions.RequestException as e:
             last_exception = e
             if attempt < retry_count - 1:
-                print(f"⚠ 請求失敗，正在重試 ({attempt + 1}/{retry_count})...")
-                time.sleep(retry_delay)
+                sleep_s = rng.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+                print(f"⚠ 請求失敗，{sleep_s:.1f} 秒後重試 ({attempt + 1}/{retry_count})...")
+                time.sleep(sleep_s)
             else:
                 raise Exception(f"請求失敗，已重試 {retry_count} 次: {str(e)}")
         
@@ -200,13 +300,34 @@ def chat_completion_simple(
     # 調用 API
     response = chat_completion(messages, api_key=api_key, model=model, **kwargs)
     
-    # 提取回覆內容
-    if "choices" in response and len(response["choices"]) > 0:
-        return response["choices"][0]["message"]["content"]
+    # 提取回覆內容（choices只取一次，不重複下標）
+    choices = response.get("choices")
+    if choices:
+        return choices[0]["message"]["content"]
     else:
         raise Exception("API 響應中沒有找到回覆內容")
 
 
+def _sse_payloads(buf: bytearray, data_lines: List[bytes], chunk: bytes) -> List[bytes]:
+    """
+    向SSE framer喂入一個網絡塊，返回其中已完成幀的data payload列表
+
+    buf和data_lines由調用方持有並跨塊復用（追加+切頭攤薄分配）；
+    空行結束一幀，多行data:按SSE規範以\\n連接
+    """
+    payloads = []
+    buf += chunk
+    while (i := buf.find(b'\n')) != -1:
+        line = bytes(buf[:i]).rstrip(b'\r')
+        del buf[:i + 1]
+        if line.startswith(b'data: '):
+            data_lines.append(line[6:])
+        elif not line and data_lines:
+            payloads.append(b'\n'.join(data_lines))
+            data_lines.clear()
+    return payloads
+
+
 def chat_completion_stream(
     messages: List[Dict[str, str]],
     api_key: str,
@@ -238,47 +359,138 @@ def chat_completion_stream(
     # 調用 API（注意：需要處理流式響應）
     # 這裡返回生成器，實際實現需要處理 SSE 格式
     url = f"{base_url}/chat/completions"
+    # 流式請求禁用壓縮：中間代理會攢夠一個完整gzip塊才放行，
+    # 逐token的SSE幀會被憋在緩衝裡；X-Accel-Buffering再關掉nginx的響應緩衝
     headers = {
         "Content-Type": "application/json",
         "Accept": "application/json",
+        "Accept-Encoding": "identity",
+        "X-Accel-Buffering": "no",
         "Authorization": f"Bearer {api_key}"
     }
-    
+
     payload = {
         "model": model,
         "messages": messages,
         "stream": True
     }
-    
+
     # 添加其他參數
     for key, value in kwargs.items():
         if key != "stream" and value is not None:
             payload[key] = value
     
     try:
-        response = requests.post(url, headers=headers, json=payload, stream=True)
+        response = _SESSION.post(url, headers=headers, data=_json_dumps(payload), stream=True)
         response.raise_for_status()
         
-        # 解析 SSE 格式的流式響應
-        for line in response.iter_lines():
-            if line:
-                line_str = line.decode('utf-8')
-                if line_str.startswith('data: '):
-                    data_str = line_str[6:]  # 移除 'data: ' 前綴
-                    if data_str == '[DONE]':
-                        break
-                    try:
-                        data = json.loads(data_str)
-                        if "choices" in data and len(data["choices"]) > 0:
-                            delta = data["choices"][0].get("delta", {})
-                            if "content" in delta:
-                                yield delta["content"]
-                    except json.JSONDecodeError:
-                        continue
+        # 解析 SSE 格式的流式響應：手動按 b"\n\n" 幀邊界切分。
+        # iter_lines內部對每個TCP讀到的塊做bytes拼接再按行重切，大塊payload時
+        # 呈O(N²)；這裡復用同一個bytearray追加+切頭，攤薄分配。
+        # 仍直接在bytes上操作，每幀省去字符串分配和多餘的UTF-8解碼
+        buf = bytearray()
+        data_lines = []
+        loads = _json_loads  # 局部綁定，熱循環裡省掉每幀的全局查找
+        for chunk in response.iter_content(chunk_size=8192):
+            if not chunk:
+                continue
+            for data in _sse_payloads(buf, data_lines, chunk):
+                if data == b'[DONE]':
+                    return
+                try:
+                    data = loads(data)
+                except json.JSONDecodeError:
+                    continue
+                # 逐級get短路，每幀只做必要的dict探測
+                choices = data.get("choices")
+                if not choices:
+                    continue
+                delta = choices[0].get("delta")
+                if delta is None:
+                    continue
+                content = delta.get("content")
+                if content:
+                    yield content
     except Exception as e:
         raise Exception(f"流式請求失敗: {str(e)}")
 
 
+async def chat_completion_stream_async(
+    messages: List[Dict[str, str]],
+    api_key: str,
+    model: str = "chatgpt-4o-latest",
+    base_url: str = "https://api.302.ai",
+    **kwargs
+) -> Any:
+    """
+    異步流式調用大語言模型 API（返回異步生成器）
+
+    與 chat_completion_stream 功能相同，但不阻塞線程：
+    單個事件循環可同時多路復用幾十條並發流（需要安裝 httpx）
+
+    參數:
+        messages (List[Dict[str, str]]): 對話消息列表
+        api_key (str): API 密鑰
+        model (str): 模型名稱
+        base_url (str): API 基礎 URL
+        **kwargs: 其他參數（不包括 stream，會自動設置為 True）
+
+    返回:
+        異步生成器: 逐步返回模型生成的內容
+
+    示例:
+        >>> async for chunk in chat_completion_stream_async(messages, api_key="your-api-key"):
+        ...     print(chunk, end="", flush=True)
+    """
+    url = f"{base_url}/chat/completions"
+    # 同步流式接口同理：identity防止代理按壓縮塊緩衝，逐token即時送達
+    headers = {
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Accept-Encoding": "identity",
+        "X-Accel-Buffering": "no",
+        "Authorization": f"Bearer {api_key}"
+    }
+
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": True
+    }
+    for key, value in kwargs.items():
+        if key != "stream" and value is not None:
+            payload[key] = value
+
+    client = _get_aclient()
+    buf = bytearray()
+    data_lines = []
+    loads = _json_loads  # 局部綁定，熱循環裡省掉每幀的全局查找
+    if _HTTPX_MODERN:
+        body_kwargs = {'content': _json_dumps(payload)}
+    else:
+        body_kwargs = {'data': _json_dumps(payload)}
+    async with client.stream("POST", url, headers=headers, **body_kwargs) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            for data in _sse_payloads(buf, data_lines, chunk):
+                if data == b'[DONE]':
+                    return
+                try:
+                    data = loads(data)
+                except json.JSONDecodeError:
+                    continue
+                # 逐級get短路，每幀只做必要的dict探測
+                choices = data.get("choices")
+                if not choices:
+                    continue
+                delta = choices[0].get("delta")
+                if delta is None:
+                    continue
+                content = delta.get("content")
+                if content:
+                    yield content
+
+
 if __name__ == "__main__":
     import sys
     import os
@@ -2,13 +2,48 @@
 下載播客音頻到本地
 支持直接音頻URL下載和RSS feed解析下載
 """
+import contextlib
 import os
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 from urllib.parse import urlparse, urljoin
 import xml.etree.ElementTree as ET
 import re
+import time
+
+# 模塊級共享Session：同一主機的RSS解析和多集下載復用keep-alive連接，
+# 省去每次請求的TCP+TLS握手
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0))
+
+
+def close():
+    """關閉共享Session的連接池（進程退出前調用）"""
+    _SESSION.close()
+
+
+# 文件名非法字符的轉換表：str.translate是單趟C循環，
+# 比正則引擎處理單字符替換快數倍（批量清理幾百個RSS標題時有感）
+_SANITIZE_TABLE = str.maketrans({c: '_' for c in '<>:"/\\|?*'})
+_WS_RE = re.compile(r'\s+')
+
+# 常見音頻擴展名（模塊級frozenset，避免每次調用重建列表）
+_AUDIO_EXTS = frozenset({'.mp3', '.m4a', '.mp4', '.ogg', '.wav', '.flac', '.aac', '.opus'})
+
+# 描述文本中音頻直鏈的模式：模塊級預編譯，免去每集對長模式串的哈希查緩存
+_AUDIO_URL_RE = re.compile(
+    r'https?://[^\s<>"\'{}|\\^`\[\]]+\.(?:mp3|m4a|mp4|ogg|wav|flac|aac|opus)',
+    re.IGNORECASE
+)
+
+# itunes命名空間的完整限定標籤（ElementTree解析後的tag格式為 {URI}local）
+_ITUNES_NS = 'http://www.itunes.com/dtds/podcast-1.0.dtd'
+_ITUNES_ENCLOSURE_TAG = f'{{{_ITUNES_NS}}}enclosure'
+_ITUNES_DURATION_TAG = f'{{{_ITUNES_NS}}}duration'
 
 
 def sanitize_filename(filename: str) -> str:
@@ -21,14 +56,12 @@ def sanitize_filename(filename: str) -> str:
     返回:
         str: 清理後的文件名
     """
-    # 移除或替換非法字符
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    # 移除或替換非法字符（模塊級轉換表，單趟C循環）
+    filename = filename.translate(_SANITIZE_TABLE)
     # 移除多餘的空白
-    filename = ' '.join(filename.split())
+    filename = _WS_RE.sub(' ', filename).strip()
     # 限制文件名長度
-    if len(filename) > 200:
-        filename = filename[:200]
-    return filename
+    return filename[:200]
 
 
 def get_file_extension_from_url(url: str) -> str:
@@ -41,12 +74,13 @@ def get_file_extension_from_url(url: str) -> str:
     返回:
         str: 文件擴展名（如 .mp3, .m4a 等）
     """
-    parsed = urlparse(url)
-    path = parsed.path
-    if '.' in path:
-        ext = os.path.splitext(path)[1].lower()
+    # 去掉query和fragment即可取到路徑尾部，省去urlparse的namedtuple分配
+    path = url.split('?', 1)[0].split('#', 1)[0]
+    i = path.rfind('.')
+    if i != -1:
+        ext = path[i:].lower()
         # 只返回常見的音頻擴展名
-        if ext in ['.mp3', '.m4a', '.mp4', '.ogg', '.wav', '.flac', '.aac', '.opus']:
+        if ext in _AUDIO_EXTS:
             return ext
     return '.mp3'  # 默認擴展名
 
@@ -54,44 +88,60 @@ def get_file_extension_from_url(url: str) -> str:
 def download_audio_file(
     audio_url: str,
     output_path: str,
-    show_progress: bool = True
+    show_progress: bool = True,
+    fileobj: Optional[Any] = None
 ) -> bool:
     """
     下載音頻文件到本地
-    
+
     參數:
         audio_url (str): 音頻文件的URL
         output_path (str): 保存路徑（包含文件名）
         show_progress (bool): 是否顯示下載進度
-    
+        fileobj (file, optional): 已打開的二進制寫入文件對象；
+            提供時直接寫入（配合O_EXCL原子創建使用），不再按路徑打開
+
     返回:
         bool: 下載是否成功
     """
     try:
         # 發送GET請求，stream=True以支持大文件下載
-        response = requests.get(audio_url, stream=True, timeout=60)
+        response = _SESSION.get(audio_url, stream=True, timeout=60)
         response.raise_for_status()
         
         # 獲取文件大小（如果可用）
         total_size = int(response.headers.get('content-length', 0))
         
-        # 確保輸出目錄存在
-        output_dir = os.path.dirname(output_path)
-        if output_dir:
-            Path(output_dir).mkdir(parents=True, exist_ok=True)
-        
-        # 下載文件
+        # 確保輸出目錄存在（調用方提供fileobj時文件已創建好）
+        if fileobj is None:
+            output_dir = os.path.dirname(output_path)
+            if output_dir:
+                Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+        # 下載文件（256KB塊減少Python層迭代次數；1MB寫緩衝把小寫合併成
+        # 大塊syscall，吞吐受限於磁盤/網絡而不是解釋器）
         downloaded_size = 0
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
+        # 進度打印節流：每0.1秒或每1MB至多刷新一次，
+        # 否則100MB的文件要做上萬次阻塞的stdout寫+flush
+        inv_total = 100.0 / total_size if total_size > 0 else 0.0
+        last_print = time.monotonic()
+        last_bytes = 0
+        f_ctx = (open(output_path, 'wb', buffering=1 << 20)
+                 if fileobj is None else contextlib.nullcontext(fileobj))
+        with f_ctx as f:
+            for chunk in response.iter_content(chunk_size=262144):
                 if chunk:
                     f.write(chunk)
                     downloaded_size += len(chunk)
-                    
-                    # 顯示進度
+
+                    # 顯示進度（節流後）
                     if show_progress and total_size > 0:
-                        percent = (downloaded_size / total_size) * 100
-                        print(f"\r  下載進度: {percent:.1f}% ({downloaded_size}/{total_size} bytes)", end='', flush=True)
+                        now = time.monotonic()
+                        if now - last_print >= 0.1 or downloaded_size - last_bytes >= 1 << 20:
+                            last_print = now
+                            last_bytes = downloaded_size
+                            percent = downloaded_size * inv_total
+                            print(f"\r  下載進度: {percent:.1f}% ({downloaded_size}/{total_size} bytes)", end='', flush=True)
         
         if show_progress:
             print()  # 換行
@@ -127,71 +177,77 @@ def parse_rss_feed(rss_url: str) -> List[Dict[str, Any]]:
     episodes = []
     
     try:
-        response = requests.get(rss_url, timeout=30)
+        # 流式下載+增量解析：不把整個feed（大的超過50MB）讀進內存再建DOM，
+        # 邊下載邊解析，峰值內存只有單個item的大小
+        response = _SESSION.get(rss_url, stream=True, timeout=30)
         response.raise_for_status()
-        
-        # 解析XML
-        root = ET.fromstring(response.content)
-        
-        # RSS feed的命名空間
-        namespaces = {
-            'itunes': 'http://www.itunes.com/dtds/podcast-1.0.dtd',
-            'atom': 'http://www.w3.org/2005/Atom',
-            'content': 'http://purl.org/rss/1.0/modules/content/'
-        }
-        
-        # 查找所有item元素（RSS 2.0標準）
-        items = root.findall('.//item')
-        
-        for item in items:
+        response.raw.decode_content = True  # 讓urllib3透明解壓gzip
+
+        context = ET.iterparse(response.raw, events=('start', 'end'))
+        _, root = next(context)  # 拿到根元素以便逐item釋放已處理的子樹
+
+        for event, elem in context:
+            # 只處理完整解析完的item元素（RSS 2.0標準）
+            if event != 'end' or elem.tag != 'item':
+                continue
+            item = elem
             episode = {}
-            
+
+            # 單次遍歷子元素按標籤建索引：每個item原本要做~6次find，
+            # 每次都是對子元素的O(children)線性掃描；一趟建dict後全部變成O(1)查找
+            by_tag = {}
+            for child in item:
+                if child.tag not in by_tag:
+                    by_tag[child.tag] = child
+
             # 提取標題
-            title_elem = item.find('title')
+            title_elem = by_tag.get('title')
             episode['title'] = title_elem.text if title_elem is not None else 'Unknown'
-            
+
             # 提取鏈接
-            link_elem = item.find('link')
+            link_elem = by_tag.get('link')
             episode['link'] = link_elem.text if link_elem is not None else ''
-            
+
             # 提取描述
-            desc_elem = item.find('description')
+            desc_elem = by_tag.get('description')
             episode['description'] = desc_elem.text if desc_elem is not None else ''
-            
+
             # 提取發布日期
-            pub_date_elem = item.find('pubDate')
+            pub_date_elem = by_tag.get('pubDate')
             episode['pub_date'] = pub_date_elem.text if pub_date_elem is not None else ''
-            
+
             # 提取音頻URL（通常在enclosure標籤中）
             audio_url = None
-            enclosure = item.find('enclosure')
+            enclosure = by_tag.get('enclosure')
             if enclosure is not None:
                 audio_url = enclosure.get('url', '')
-            
-            # 如果沒有enclosure，嘗試從description或content中提取
+
+            # 如果沒有enclosure，嘗試從itunes:enclosure獲取
             if not audio_url:
-                # 嘗試從itunes:enclosure獲取
-                itunes_enclosure = item.find('itunes:enclosure', namespaces)
+                itunes_enclosure = by_tag.get(_ITUNES_ENCLOSURE_TAG)
                 if itunes_enclosure is not None:
                     audio_url = itunes_enclosure.get('url', '')
-            
+
             if not audio_url:
-                # 從描述中搜索音頻鏈接
-                desc_text = episode['description']
-                url_pattern = r'https?://[^\s<>"\'{}|\\^`\[\]]+\.(?:mp3|m4a|mp4|ogg|wav|flac|aac|opus)'
-                matches = re.findall(url_pattern, desc_text, re.IGNORECASE)
-                if matches:
-                    audio_url = matches[0]
+                # 從描述中搜索音頻鏈接（search找到第一個就短路返回，
+                # 不像findall掃完整段長描述）
+                m = _AUDIO_URL_RE.search(episode['description'] or '')
+                if m:
+                    audio_url = m.group(0)
             
             episode['audio_url'] = audio_url if audio_url else ''
             
             # 提取時長（itunes:duration）
-            duration_elem = item.find('itunes:duration', namespaces)
+            duration_elem = by_tag.get(_ITUNES_DURATION_TAG)
             episode['duration'] = duration_elem.text if duration_elem is not None else ''
             
             if episode['audio_url']:
                 episodes.append(episode)
-        
+
+            # 釋放已處理item的子樹，並清掉根上累積的引用，保持內存O(單個item)
+            item.clear()
+            root.clear()
+
         return episodes
         
     except requests.exceptions.RequestException as e:
@@ -243,30 +299,38 @@ def download_podcast_from_url(
     if not filename.endswith(ext):
         filename = os.path.splitext(filename)[0] + ext
     
-    # 構建完整路徑
-    output_path = os.path.join(output_dir, filename)
-    
-    # 如果文件已存在，添加編號
-    if os.path.exists(output_path):
-        base, ext = os.path.splitext(filename)
-        counter = 1
-        while os.path.exists(output_path):
-            new_filename = f"{base}_{counter}{ext}"
-            output_path = os.path.join(output_dir, new_filename)
+    # 原子地創建唯一文件：O_CREAT|O_EXCL讓OS在單次syscall裡保證唯一性。
+    # 原來的os.path.exists循環既要O(重名數)次stat，在並發下載下還有競態
+    # （兩個worker可能同時選中同一個新名字）
+    base, file_ext = os.path.splitext(filename)
+    counter = 0
+    while True:
+        candidate = filename if counter == 0 else f"{base}_{counter}{file_ext}"
+        output_path = os.path.join(output_dir, candidate)
+        try:
+            fd = os.open(output_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            break
+        except FileExistsError:
             counter += 1
-    
+
     if show_progress:
         print(f"正在下載: {audio_url}")
         print(f"保存到: {output_path}")
-    
-    # 下載文件
-    success = download_audio_file(audio_url, output_path, show_progress=show_progress)
-    
+
+    # 下載文件（寫入已原子創建的文件對象，同樣帶1MB寫緩衝）
+    with os.fdopen(fd, 'wb', buffering=1 << 20) as f:
+        success = download_audio_file(audio_url, output_path, show_progress=show_progress, fileobj=f)
+
     if success:
         if show_progress:
             print(f"✓ 下載完成: {output_path}")
         return output_path
     else:
+        # 下載失敗時清掉留下的空文件/殘片，避免占用唯一名
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
         return None
 
 
@@ -341,6 +405,78 @@ def download_podcast_from_rss(
     )
 
 
+def download_podcasts_from_rss(
+    rss_url: str,
+    output_dir: Optional[str] = None,
+    n: int = 10,
+    show_progress: bool = True
+) -> List[str]:
+    """
+    從RSS feed並發下載最新的多集播客
+
+    下載是I/O密集操作，socket讀取時釋放GIL，線程池並發幾乎能
+    線性加速到帶寬上限；所有worker共享模塊級Session的連接池，
+    同一主機的多集下載免去重複TLS握手
+
+    參數:
+        rss_url (str): RSS feed URL
+        output_dir (str, optional): 輸出目錄，默認為 'downloads'
+        n (int): 要下載的集數（從最新開始），默認為10
+        show_progress (bool): 是否顯示進度（並發下載時不顯示逐字節進度）
+
+    返回:
+        List[str]: 成功下載的文件路徑列表
+    """
+    if show_progress:
+        print(f"📡 正在解析RSS feed: {rss_url}")
+
+    try:
+        episodes = parse_rss_feed(rss_url)
+    except Exception as e:
+        if show_progress:
+            print(f"❌ 錯誤: {e}")
+        return []
+
+    if not episodes:
+        if show_progress:
+            print("❌ RSS feed中未找到音頻文件")
+        return []
+
+    selected = episodes[:n]
+    if show_progress:
+        print(f"✓ 找到 {len(episodes)} 集，並發下載最新 {len(selected)} 集...")
+
+    results = []
+    with ThreadPoolExecutor(max_workers=min(8, len(selected))) as executor:
+        # 逐字節進度在並發下會互相覆蓋\r行，關閉它，按集數彙報
+        futures = {
+            executor.submit(
+                download_podcast_from_url,
+                episode['audio_url'],
+                output_dir,
+                sanitize_filename(episode['title']),
+                False
+            ): episode
+            for episode in selected
+        }
+        for future in as_completed(futures):
+            episode = futures[future]
+            try:
+                path = future.result()
+            except Exception as e:
+                path = None
+                if show_progress:
+                    print(f"  ⚠️ 下載失敗 [{episode['title']}]: {e}")
+            if path:
+                results.append(path)
+                if show_progress:
+                    print(f"  ✓ ({len(results)}/{len(selected)}) {episode['title']}")
+
+    if show_progress:
+        print(f"✓ 完成：成功下載 {len(results)}/{len(selected)} 集")
+    return results
+
+
 def download_podcast_simple(url: str) -> Optional[str]:
     """
     簡單版本：自動檢測URL類型並下載
@@ -361,7 +497,7 @@ def download_podcast_simple(url: str) -> Optional[str]:
     else:
         # 嘗試發送HEAD請求檢查Content-Type
         try:
-            response = requests.head(url, timeout=10, allow_redirects=True)
+            response = _SESSION.head(url, timeout=10, allow_redirects=True)
             content_type = response.headers.get('content-type', '').lower()
             if 'xml' in content_type or 'rss' in content_type or 'atom' in content_type:
                 is_rss = True
@@ -7,6 +7,48 @@ import os
 from pathlib import Path
 
 
+def _default_progress_hook(d):
+    """默認的進度打印hook"""
+    if d['status'] == 'downloading':
+        total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
+        downloaded = d.get('downloaded_bytes', 0)
+        if total > 0:
+            percent = (downloaded / total) * 100
+            speed = d.get('speed', 0)
+            if speed:
+                speed_str = f"{speed/1024/1024:.1f}MB/s"
+            else:
+                speed_str = "計算中..."
+            print(f"\r下載進度: {percent:.1f}% ({speed_str})", end='', flush=True)
+    elif d['status'] == 'finished':
+        print(f"\n✓ 下載完成，正在轉換音頻格式...")
+
+
+def _build_ydl(output_dir, filename_tmpl, progress_hook=None):
+    """
+    構建每次調用專屬的YoutubeDL實例
+
+    web端用多線程並發下載，而YoutubeDL實例不是線程安全的，
+    進度hook也必須跟著調用走——不緩存、不共享，每次現建
+    """
+    hooks = [_default_progress_hook]
+    if progress_hook is not None:
+        hooks.insert(0, progress_hook)
+    ydl_opts = {
+        'format': 'bestaudio/best',  # 選擇最佳音頻格式
+        'postprocessors': [{
+            'key': 'FFmpegExtractAudio',  # 使用FFmpeg提取音頻
+            'preferredcodec': 'mp3',      # 輸出為MP3格式
+            'preferredquality': '192',    # 音質：192kbps
+        }],
+        'outtmpl': os.path.join(output_dir, filename_tmpl),  # 輸出文件名模板
+        'quiet': False,  # 顯示下載進度
+        'no_warnings': False,
+        'progress_hooks': hooks,  # 本次調用專屬的hook鏈
+    }
+    return yt_dlp.YoutubeDL(ydl_opts)
+
+
 def download_youtube_audio(url, output_dir=None, filename=None, progress_hook=None):
     """
     下載YouTube視頻的音頻到本地
@@ -26,77 +68,39 @@ def download_youtube_audio(url, output_dir=None, filename=None, progress_hook=No
     
     # 創建輸出目錄（如果不存在）
     Path(output_dir).mkdir(parents=True, exist_ok=True)
-    
-    # 定義進度回調函數
-    def default_progress_hook(d):
-        if progress_hook:
-            progress_hook(d)
-        # 保持原有打印輸出（當沒有自定義回調時）
-        if d['status'] == 'downloading':
-            total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-            downloaded = d.get('downloaded_bytes', 0)
-            if total > 0:
-                percent = (downloaded / total) * 100
-                speed = d.get('speed', 0)
-                if speed:
-                    speed_str = f"{speed/1024/1024:.1f}MB/s"
-                else:
-                    speed_str = "計算中..."
-                print(f"\r下載進度: {percent:.1f}% ({speed_str})", end='', flush=True)
-        elif d['status'] == 'finished':
-            print(f"\n✓ 下載完成，正在轉換音頻格式...")
-    
-    # 配置yt-dlp選項
-    ydl_opts = {
-        'format': 'bestaudio/best',  # 選擇最佳音頻格式
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',  # 使用FFmpeg提取音頻
-            'preferredcodec': 'mp3',      # 輸出為MP3格式
-            'preferredquality': '192',    # 音質：192kbps
-        }],
-        'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),  # 輸出文件名模板
-        'quiet': False,  # 顯示下載進度
-        'no_warnings': False,
-        'progress_hooks': [default_progress_hook],  # 添加進度回調
-    }
-    
-    # 如果指定了自定義文件名，則使用它
-    if filename:
-        ydl_opts['outtmpl'] = os.path.join(output_dir, f'{filename}.%(ext)s')
-    
+
+    # 每次調用建獨立的YoutubeDL實例：hook隨調用走，並發下載互不串線
+    filename_tmpl = f'{filename}.%(ext)s' if filename else '%(title)s.%(ext)s'
+    ydl = _build_ydl(output_dir, filename_tmpl, progress_hook)
+
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            # 獲取視頻信息（不下載）
-            info = ydl.extract_info(url, download=False)
-            video_title = info.get('title', 'Unknown')
-            video_id = info.get('id', 'Unknown')
-            
-            print(f"正在下載: {video_title}")
-            print(f"視頻ID: {video_id}")
-            print(f"保存位置: {output_dir}")
-            
-            # 下載音頻
-            ydl.download([url])
-            
-            # 查找剛下載的文件（查找最新的MP3文件）
-            mp3_files = list(Path(output_dir).glob('*.mp3'))
-            if mp3_files:
-                # 按修改時間排序，獲取最新的文件
-                latest_file = max(mp3_files, key=os.path.getmtime)
-                print(f"✓ 下載完成: {latest_file}")
-                return str(latest_file)
-            else:
-                print("⚠ 下載完成，但無法找到MP3輸出文件")
-                # 嘗試查找其他音頻格式
-                audio_files = list(Path(output_dir).glob('*.m4a')) + \
-                             list(Path(output_dir).glob('*.opus')) + \
-                             list(Path(output_dir).glob('*.webm'))
-                if audio_files:
-                    latest_file = max(audio_files, key=os.path.getmtime)
-                    print(f"⚠ 找到音頻文件（非MP3格式）: {latest_file}")
-                    return str(latest_file)
-                return None
-                    
+        # 一次extract_info(download=True)同時抓取元數據並下載，
+        # 省去先download=False再download的第二次網絡元數據請求
+        info = ydl.extract_info(url, download=True)
+        video_title = info.get('title', 'Unknown')
+        video_id = info.get('id', 'Unknown')
+
+        print(f"✓ 已下載: {video_title}")
+        print(f"視頻ID: {video_id}")
+        print(f"保存位置: {output_dir}")
+
+        # 直接從info_dict推導輸出路徑（FFmpegExtractAudio後處理器
+        # 會把擴展名改寫為mp3）。不再glob整個目錄按mtime找最新文件——
+        # 那要對目錄裡每個文件stat一次，並發下載完成順序亂時還會拿錯文件
+        original_path = ydl.prepare_filename(info)
+        final_path = os.path.splitext(original_path)[0] + '.mp3'
+        if os.path.exists(final_path):
+            print(f"✓ 下載完成: {final_path}")
+            return final_path
+
+        # 後處理器未生成MP3時（如缺少FFmpeg），回退到原始下載文件
+        if os.path.exists(original_path):
+            print(f"⚠ 找到音頻文件（非MP3格式）: {original_path}")
+            return original_path
+
+        print("⚠ 下載完成，但無法找到輸出文件")
+        return None
+
     except yt_dlp.utils.DownloadError as e:
         print(f"❌ 下載錯誤: {e}")
         return None
@@ -3,14 +3,121 @@
 支持將長文本分塊，對每個塊進行總結，最後生成整體總結
 支持異步並發處理和更大的文本塊
 """
+import asyncio
+import bisect
+import hashlib
+import heapq
+import io
 import os
+import re
 import sys
+import threading
+import time
 import logging
+from collections import deque
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Optional
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+# httpx用於asyncio並發路徑（單事件循環多路復用取代N個OS線程）；
+# 未安裝時回退到線程池
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# numpy用於超大文本的向量化分隔符掃描；未安裝時走純Python的rfind路徑
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# tiktoken用於可選的按token數分塊；未安裝時只支持按字符數分塊
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# diskcache用於按內容哈希緩存LLM總結結果：同一文檔重跑（調試、中途
+# 出錯重來）時跳過已付費的網絡+LLM調用；未安裝時不緩存
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+# tqdm用單行進度條取代每塊一行的print：N個並發worker各自print要
+# 逐次搶sys.stdout鎖並flush，tqdm按節流間隔批量刷新；未安裝時回退print
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+# 文本超過這個字符數時才值得付一次utf-32編碼開銷換取向量化掃描
+_NUMPY_SCAN_THRESHOLD = 1_000_000
+
+# libc的memrchr是SIMD向量化的單字節反向掃描。CPython的str.rfind只在
+# UCS-1（純ASCII/Latin-1）存儲的字符串上走memrchr快路徑，中文文本是
+# UCS-2/UCS-4存儲，rfind退化為逐碼點的C循環。未安裝numpy時，大文本
+# 改在utf-32-le字節視圖上直接調libc.memrchr：先匹配分隔符的最低字節，
+# 再驗證4字節對齊和完整碼點，誤命中繼續向左掃
+try:
+    import ctypes
+    import ctypes.util
+
+    _LIBC = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6')
+    _LIBC.memrchr.restype = ctypes.c_void_p
+    _LIBC.memrchr.argtypes = (ctypes.c_void_p, ctypes.c_int, ctypes.c_size_t)
+except (ImportError, OSError, AttributeError):
+    _LIBC = None
+
+
+def _memrchr_u32(buf: bytes, addr: int, ch: str, start: int, end: int) -> int:
+    """
+    在utf-32-le字節視圖buf的碼點區間[start, end)內反向查找字符ch
+
+    返回碼點下標（等價於text.rfind(ch, start, end)），找不到返回-1
+
+    選utf-32而不是utf-8作字節視圖：定寬4字節下"字節偏移//4"就是
+    字符下標，不需要額外維護字節→碼點的換算表（utf-8要配一張
+    每字節8字節的cumsum下標表，比utf-32視圖本身還大）
+    """
+    code = ord(ch)
+    low = code & 0xFF
+    # 誤命中驗證逐字節比較，省掉每次3字節切片的bytes分配
+    b1 = (code >> 8) & 0xFF
+    b2 = (code >> 16) & 0xFF
+    lo_b = start * 4
+    hi_b = end * 4
+    while hi_b > lo_b:
+        p = _LIBC.memrchr(addr + lo_b, low, hi_b - lo_b)
+        if not p:
+            return -1
+        off = p - addr
+        if (off % 4 == 0 and buf[off + 1] == b1
+                and buf[off + 2] == b2 and buf[off + 3] == 0):
+            return off // 4
+        hi_b = off
+    return -1
+
+
+# 四種分隔符合併成一個字符類，re的C引擎單趟掃描就能同時收集
+# 全部位置，取代每種分隔符各掃一遍文本的str.find循環
+_BOUNDARY_RE = re.compile('[。！？\n]')
+
+# 分隔符 → 在sep_lists裡的下標（即優先級順序：。 > ！ > ？ > \n）
+_SEP_ORDER = {'。': 0, '！': 1, '？': 2, '\n': 3}
+
+
+def _scan_separators(text: str) -> list:
+    """一趟regex掃描，按優先級分列收集所有分隔符位置（各列升序）"""
+    sep_lists = [[], [], [], []]
+    order = _SEP_ORDER
+    for m in _BOUNDARY_RE.finditer(text):
+        sep_lists[order[m.group()]].append(m.start())
+    return sep_lists
+
 # 處理導入路徑
 try:
     from app.core.chat_completion import chat_completion_simple
@@ -60,42 +167,172 @@ def setup_logger(log_file: Optional[str] = None):
     return logger
 
 
-def split_text_into_chunks(
+# 模塊級線程池單例：每次調用都with ThreadPoolExecutor(...)要新建並銷毀
+# 最多max_workers個線程（每個~8MB棧），還把chat_completion_simple裡
+# Session的keep-alive連接跟著線程一起丟掉。懶初始化後跨調用復用，
+# 需要更多worker時才換一個更大的池
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_executor(max_workers: int) -> ThreadPoolExecutor:
+    """返回共享的線程池（容量不足時換更大的池；不在調用結束時關閉）"""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None or _EXECUTOR._max_workers < max_workers:
+            if _EXECUTOR is not None:
+                _EXECUTOR.shutdown(wait=False)
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix='summ'
+            )
+        return _EXECUTOR
+
+
+class _LatencyStats:
+    """
+    滾動記錄最近API調用的(延遲, 是否限流)，按AIMD給出建議並發數
+
+    固定max_workers=5在API快時留着余量、被限流時又繼續硬打，
+    觸發重試和長尾延遲。這裡做加性增/乘性減（AIMD）：
+    最近窗口沒有限流就每次調用+1上探，一旦觀察到限流立即減半
+    """
+
+    def __init__(self, window: int = 64):
+        self._samples = deque(maxlen=window)  # (延遲秒, 是否限流)
+        self._lock = threading.Lock()
+        self._current: Optional[int] = None
+
+    def record(self, latency: float, throttled: bool):
+        """記錄一次API調用結果；限流時立即乘性減半"""
+        with self._lock:
+            self._samples.append((latency, throttled))
+            if throttled and self._current is not None:
+                self._current = max(1, self._current // 2)
+
+    def recommend(self, requested: int) -> int:
+        """返回本次調用建議的並發數（首次調用從requested起步）"""
+        with self._lock:
+            ceiling = requested * 2
+            if self._current is None:
+                self._current = requested
+            elif self._samples and not any(t for _, t in self._samples):
+                # 加性增：最近窗口全部健康，逐步上探
+                self._current = min(ceiling, self._current + 1)
+            return max(1, min(self._current, ceiling))
+
+
+_LATENCY_STATS = _LatencyStats()
+
+# 提示詞改版時遞增，讓舊緩存整體失效
+_PROMPT_VERSION = '1'
+
+_SUMMARY_CACHE = None
+_SUMMARY_CACHE_LOCK = threading.Lock()
+
+
+def _get_summary_cache():
+    """懶初始化的磁盤緩存（未安裝diskcache或打開失敗時返回None）"""
+    global _SUMMARY_CACHE
+    if diskcache is None:
+        return None
+    if _SUMMARY_CACHE is None:
+        with _SUMMARY_CACHE_LOCK:
+            if _SUMMARY_CACHE is None:
+                try:
+                    _SUMMARY_CACHE = diskcache.Cache(
+                        os.path.expanduser('~/.cache/summarize')
+                    )
+                except Exception:
+                    return None
+    return _SUMMARY_CACHE
+
+
+def _cache_key(*parts: str) -> str:
+    """把(種類, 提示版本, 模型, 語言, 內容)哈希成內容尋址的緩存鍵"""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+# 判定為"服務端壓力/限流"的錯誤特徵（匹配異常消息里的狀態碼或短語）
+_THROTTLE_MARKERS = ('429', '500', '502', '503', '504',
+                     'rate limit', 'too many requests')
+
+
+def _is_throttle_error(exc: BaseException) -> bool:
+    """該異常是否表明API被打滿（應當乘性降並發）"""
+    msg = str(exc).lower()
+    return any(marker in msg for marker in _THROTTLE_MARKERS)
+
+
+def iter_chunk_spans(
     text: str,
     chunk_size: int = 100000,  # GPT-4o 支持 128k tokens，约等于 100k-150k 字符（中文/英文混合）
     chunk_overlap: int = 300  # 相应增大重叠部分以保持上下文连贯性
-) -> List[str]:
+):
     """
-    將長文本分塊
-    
+    惰性生成文本塊的 (start, end) 索引區間
+
+    不預先物化所有塊的字符串切片：10MB文本按100k分塊要複製約100份
+    共~10MB的str，峰值內存翻倍。調用方在真正提交總結時再做切片，
+    已總結完的塊字符串可被GC及時回收
+
     參數:
         text (str): 要分塊的文本
-        chunk_size (int): 每塊的最大字符數，默認為 100000（充分利用 GPT-4o 的 128k tokens 上下文）
-        chunk_overlap (int): 塊之間的重疊字符數，默認為 5000
-    
+        chunk_size (int): 每塊的最大字符數
+        chunk_overlap (int): 塊之間的重疊字符數
+
     返回:
-        List[str]: 文本塊列表
-    
-    示例:
-        >>> text = "很長的文本..."
-        >>> chunks = split_text_into_chunks(text, chunk_size=1000)
-        >>> print(f"分成 {len(chunks)} 塊")
+        Iterator[Tuple[int, int]]: 每塊在text中的索引區間（已去除兩端空白）
     """
     if not text:
-        return []
-    
+        return
+
     text_length = len(text)
-    
+
     # 如果文本長度小於塊大小，直接返回整個文本作為一個塊
     if text_length <= chunk_size:
-        return [text]
-    
-    chunks = []
+        yield (0, text_length)
+        return
+
     start = 0
-    
+
     # 確保每次至少處理一定數量的字符，避免產生過多小塊
     min_chunk_size = max(100, chunk_size // 100)  # 至少100字符或chunk_size的1%
-    
+
+    # 超大文本：一次向量化掃描預計算全部分隔符位置。
+    # utf-32-le視圖下數組下標就是字符索引，無需字節↔碼點換算。
+    # 分隔符的優先級（'。'=4 > '！'=3 > '？'=2 > '\n'=1）查表分類後
+    # 合併進同一對(位置, 優先級)數組——無分支的向量化分類，
+    # 之後每個塊邊界只在searchsorted出的小窗口裡按優先級挑最右命中
+    sep_positions = None
+    sep_priorities = None
+    if np is not None and text_length >= _NUMPY_SCAN_THRESHOLD:
+        arr = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        prio = np.zeros(arr.shape, dtype=np.uint8)
+        for p, ch in enumerate(('\n', '？', '！', '。'), start=1):
+            prio[arr == ord(ch)] = p
+        sep_positions = np.flatnonzero(prio)
+        sep_priorities = prio[sep_positions]
+        del arr, prio
+
+    # 無numpy時的大文本退路：utf-32-le視圖+libc.memrchr反向掃描
+    # （c_char_p零拷貝借用bytes的內部緩衝，buf存活期間地址有效）
+    u32_buf = None
+    u32_addr = None
+    if sep_positions is None and _LIBC is not None and text_length >= _NUMPY_SCAN_THRESHOLD:
+        u32_buf = text.encode('utf-32-le')
+        u32_addr = ctypes.cast(ctypes.c_char_p(u32_buf), ctypes.c_void_p).value
+
+    # 純Python的最後退路：numpy和libc.memrchr都不可用時，一趟編譯好的
+    # regex掃描預計算各分隔符的位置表（按優先級分列），之後每個塊邊界
+    # 從逐字符重掃變成O(logN)的二分查找
+    sep_lists = None
+    if sep_positions is None and u32_buf is None and text_length >= _NUMPY_SCAN_THRESHOLD:
+        sep_lists = _scan_separators(text)
+
+
     while start < text_length:
         # 計算當前塊的結束位置
         end = min(start + chunk_size, text_length)
@@ -103,25 +340,66 @@ def split_text_into_chunks(
         
         # 如果不是最後一塊，嘗試在句號、換行符等位置切斷
         if end < text_length:
-            # 尋找合適的分割點（優先選擇句號、問號、感嘆號、換行符）
-            for separator in ['。\n', '。 ', '\n\n', '。', '！', '？', '\n']:
-                last_sep = text.rfind(separator, start, end)
-                if last_sep != -1:
+            # 尋找合適的分割點（優先選擇句號、問號、感嘆號、換行符）。
+            # 單字符rfind走CPython的memrchr快路徑（glibc裡是SIMD向量化的），
+            # 原來的雙字符分隔符（'。\n'、'。 '、'\n\n'）通過O(1)查看後繼字符
+            # 一併覆蓋，掃描字節量從~7×chunk_size降到~1×chunk_size；
+            # 預計算過分隔符位置時改為二分查找窗口+按優先級挑最右命中，
+            # 完全不重掃文本
+            if sep_positions is not None:
+                lo = np.searchsorted(sep_positions, start)
+                hi = np.searchsorted(sep_positions, end)
+                window_prio = sep_priorities[lo:hi]
+                for p in (4, 3, 2, 1):
+                    cand = np.flatnonzero(window_prio == p)
+                    if cand.size == 0:
+                        continue
+                    last_sep = int(sep_positions[lo + cand[-1]])
+                    potential_end = last_sep + 1
+                    # 緊跟的換行/空格也計入分割點（對應原'。\n'、'。 '、'\n\n'）
+                    if potential_end < text_length and text[potential_end] in '\n ':
+                        potential_end += 1
                     # 確保分割點不會導致塊太小
-                    potential_end = last_sep + len(separator)
                     if potential_end - start >= min_chunk_size:
                         end = potential_end
                         break
+            else:
+                for prio_idx, sep_char in enumerate(('。', '！', '？', '\n')):
+                    if sep_lists is not None:
+                        # 位置表上二分出[start, end)內最靠右的命中
+                        positions = sep_lists[prio_idx]
+                        idx = bisect.bisect_left(positions, end) - 1
+                        if idx >= 0 and positions[idx] >= start:
+                            last_sep = positions[idx]
+                        else:
+                            last_sep = -1
+                    elif u32_buf is not None:
+                        last_sep = _memrchr_u32(u32_buf, u32_addr, sep_char, start, end)
+                    else:
+                        last_sep = text.rfind(sep_char, start, end)
+                    if last_sep != -1:
+                        potential_end = last_sep + 1
+                        # 緊跟的換行/空格也計入分割點（對應原'。\n'、'。 '、'\n\n'）
+                        if potential_end < text_length and text[potential_end] in '\n ':
+                            potential_end += 1
+                        # 確保分割點不會導致塊太小
+                        if potential_end - start >= min_chunk_size:
+                            end = potential_end
+                            break
         
         # 如果剩餘文本不足最小塊大小，直接取到末尾
         if text_length - start < min_chunk_size:
             end = text_length
         
-        # 提取當前塊
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-        
+        # 去除區間兩端空白（等價於切片後strip，但不複製字符串）
+        s, e = start, end
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        if s < e:
+            yield (s, e)
+
         # 計算下一個塊的起始位置（考慮重疊）
         # 確保至少向前移動一定距離，避免陷入無限循環
         next_start = max(end - chunk_overlap, start + min(1000, chunk_size // 10))
@@ -133,8 +411,312 @@ def split_text_into_chunks(
             start = end
             if start >= text_length:
                 break
-    
-    return chunks
+
+
+def split_text_into_chunks(
+    text: str,
+    chunk_size: int = 100000,
+    chunk_overlap: int = 300
+) -> List[str]:
+    """
+    將長文本分塊（兼容接口：物化所有塊字符串）
+
+    新代碼請直接用 iter_chunk_spans 按需切片，避免一次性複製所有塊
+
+    示例:
+        >>> text = "很長的文本..."
+        >>> chunks = split_text_into_chunks(text, chunk_size=1000)
+        >>> print(f"分成 {len(chunks)} 塊")
+    """
+    return [text[s:e] for s, e in iter_chunk_spans(text, chunk_size, chunk_overlap)]
+
+
+def _token_chunk_spans(
+    text: str,
+    enc,
+    chunk_size_tokens: int = 25000,
+    chunk_overlap_tokens: int = 100
+) -> list:
+    """
+    按token數分塊，返回text中的字符索引區間列表
+
+    按字符數分塊對模型的token限制只是近似（中文約0.5字符/token，
+    代碼約4字符/token），字符數合格的塊仍可能超token上限導致截斷或重試。
+    這裡整篇只編碼一次，在token id序列上找塊邊界，邊界吸附到能單token
+    編碼的句界符（'。'、'！'、'？'、'\\n'），再增量decode把token下標
+    換算回字符下標——邊界都落在完整句末，decode切片不會劈開多字節字符
+
+    參數:
+        text (str): 要分塊的文本
+        enc: tiktoken編碼器（如 tiktoken.encoding_for_model(model)）
+        chunk_size_tokens (int): 每塊的最大token數
+        chunk_overlap_tokens (int): 塊之間的目標重疊token數（吸附到句界）
+
+    返回:
+        List[Tuple[int, int]]: 每塊在text中的字符索引區間（已去除兩端空白）
+    """
+    ids = enc.encode(text)
+    n = len(ids)
+    if n == 0:
+        return []
+
+    # 只有整體編碼為單個token的分隔符才能直接在id序列上匹配
+    boundary_ids = set()
+    for sep in ('。', '！', '？', '\n'):
+        toks = enc.encode(sep)
+        if len(toks) == 1:
+            boundary_ids.add(toks[0])
+
+    min_chunk = max(50, chunk_size_tokens // 100)
+
+    tok_spans = []
+    start = 0
+    while start < n:
+        end = min(start + chunk_size_tokens, n)
+        if end < n and boundary_ids:
+            # 在窗口內反向找最後一個句界token
+            for j in range(end - 1, start + min_chunk - 1, -1):
+                if ids[j] in boundary_ids:
+                    end = j + 1
+                    break
+        if n - start < min_chunk:
+            end = n
+        tok_spans.append((start, end))
+        if end >= n:
+            break
+        # 重疊起點同樣吸附到句界token；找不到就不重疊
+        next_start = end
+        lo = max(start + 1, end - chunk_overlap_tokens)
+        for j in range(lo - 1, start, -1):
+            if ids[j] in boundary_ids:
+                next_start = j + 1
+                break
+        start = next_start
+
+    # 增量decode：按序換算每個邊界token下標對應的字符下標（整體O(N)一趟，
+    # 不為每個邊界重新decode前綴）
+    marks = sorted({p for span in tok_spans for p in span})
+    char_at = {}
+    prev_tok = 0
+    prev_char = 0
+    for m in marks:
+        prev_char += len(enc.decode(ids[prev_tok:m]))
+        char_at[m] = prev_char
+        prev_tok = m
+
+    spans = []
+    for ts, te in tok_spans:
+        s, e = char_at[ts], char_at[te]
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        if s < e:
+            spans.append((s, e))
+    return spans
+
+
+# 分塊結果緩存：同一文本換language/調試重跑時免去整趟重掃。
+# 不直接對text做lru_cache（會長期持有多MB的大字符串），
+# 鍵用(哈希, 長度, 分塊參數)，值只是輕量的區間列表
+_SPANS_CACHE = {}
+_SPANS_CACHE_MAX = 32
+
+
+def _cached_chunk_spans(text: str, chunk_size: int, chunk_overlap: int) -> list:
+    """返回分塊區間列表（帶小型緩存；緩存滿時整體清空）"""
+    key = (hash(text), len(text), chunk_size, chunk_overlap)
+    spans = _SPANS_CACHE.get(key)
+    if spans is None:
+        spans = list(iter_chunk_spans(text, chunk_size, chunk_overlap))
+        if len(_SPANS_CACHE) >= _SPANS_CACHE_MAX:
+            _SPANS_CACHE.clear()
+        _SPANS_CACHE[key] = spans
+    return spans
+
+
+# 提示詞模板統一放在模塊級：系統提示在一次運行的N個塊間完全相同，
+# 按language記憶化後不再每塊重建同樣的幾百字節字符串
+_CHUNK_SYSTEM_TMPL = """你是一個專業的文本總結助手。你的任務是對給定的文本進行深入分析，提取並總結核心觀點和論述。
+要求：
+1. 重點總結文本中的核心觀點、論證和主張
+2. 提供具體的論證過程、案例和數據支持（如果有的話）
+3. 使用{language}進行總結
+4. 採用分段展示的方式，每個觀點或論述使用獨立段落
+5. 保持邏輯清晰，結構完整，避免過於簡化
+6. 如果文本涉及特定領域（如技術、科學、商業等），請保持專業性和準確性"""
+
+_CHUNK_PROMPT_TMPL = """請對以下文本（第 {chunk_index}/{total_chunks} 塊）進行深入總結，重點關注觀點和論述：
+
+{chunk}
+
+請按照以下要求提供總結：
+1. 提取文本中的核心觀點和主要論述
+2. 提供具體的論證過程、案例、數據或例證（如文本中包含）
+3. 使用分段展示，每個主要觀點或論述單獨成段
+4. 保持內容具體，避免過於抽象或概括
+5. 確保邏輯連貫，觀點清晰
+
+請開始總結："""
+
+_MERGE_SYSTEM_TMPL = """你是一個專業的文本總結助手。你的任務是把同一篇長文本中相鄰部分的多份總結合併為一份連貫的總結。
+要求：
+1. 整合所有要點，消除重複信息，但保留具體的觀點、論證、案例和數據
+2. 使用{language}進行總結
+3. 採用分段展示的方式，保持邏輯清晰、結構完整"""
+
+_FINAL_SYSTEM_TMPL = """你是一個專業的文本總結助手。你的任務是根據多個文本塊的總結，生成一個完整、連貫、具體的整體總結。
+要求：
+1. 整合所有塊的總結，形成一個邏輯清晰的整體總結
+2. 重點總結文本的核心觀點、論證和主張
+3. 提供具體的論證過程、案例、數據或例證
+4. 使用分段展示的方式，每個主要觀點或論述使用獨立段落
+5. 消除重複信息，但保留重要的觀點細節
+6. 保持總結的完整性和連貫性
+7. 使用{language}進行總結
+8. 確保總結能夠全面、具體地反映原文的核心內容和主要觀點"""
+
+
+@lru_cache(maxsize=8)
+def _chunk_system_prompt(language: str) -> str:
+    """單塊總結的系統提示（按語言記憶化）"""
+    return _CHUNK_SYSTEM_TMPL.format(language=language)
+
+
+@lru_cache(maxsize=8)
+def _merge_system_prompt(language: str) -> str:
+    """中間合併的系統提示（按語言記憶化）"""
+    return _MERGE_SYSTEM_TMPL.format(language=language)
+
+
+@lru_cache(maxsize=8)
+def _final_system_prompt(language: str) -> str:
+    """最終總結的系統提示（按語言記憶化）"""
+    return _FINAL_SYSTEM_TMPL.format(language=language)
+
+
+def _build_chunk_prompts(chunk, chunk_index, total_chunks, language):
+    """構建單塊總結的 (system_prompt, prompt)（同步與異步路徑共用）"""
+    prompt = _CHUNK_PROMPT_TMPL.format(
+        chunk_index=chunk_index, total_chunks=total_chunks, chunk=chunk
+    )
+    return _chunk_system_prompt(language), prompt
+
+
+async def _summarize_all_async(
+    text: str,
+    spans: list,
+    api_key: str,
+    model: str,
+    language: str,
+    logger: Optional[logging.Logger],
+    show_progress: bool,
+    max_workers: int,
+    base_url: str = "https://api.302.ai",
+    pbar=None
+) -> List[str]:
+    """
+    用asyncio並發總結所有塊
+
+    單個事件循環+共享連接池多路復用N個在途請求，省掉每線程~8MB的棧；
+    gather天然按提交順序返回，不再需要as_completed+results_dict重排。
+    失敗的塊返回"[總結失敗: ...]"佔位，與同步路徑行為一致
+    """
+    total_chunks = len(spans)
+    # httpx在0.14把連接池參數從PoolLimits/pool_limits=改名為Limits/limits=；
+    # googletrans鎖定的0.13.x只有舊拼法，按裝到的版本選
+    if getattr(httpx, 'Limits', None) is not None:
+        limit_kwargs = {'limits': httpx.Limits(max_connections=max_workers)}
+    else:
+        limit_kwargs = {'pool_limits': httpx.PoolLimits(hard_limit=max_workers)}
+    try:
+        client = httpx.AsyncClient(http2=True, timeout=60, **limit_kwargs)
+    except ImportError:
+        # 未安裝h2時退回HTTP/1.1
+        client = httpx.AsyncClient(timeout=60, **limit_kwargs)
+
+    semaphore = asyncio.Semaphore(max_workers)
+    completed = 0
+
+    cache = _get_summary_cache()
+
+    async def _one(chunk_index: int, s: int, e: int) -> str:
+        nonlocal completed
+        chunk = text[s:e]
+
+        # 磁盤緩存命中直接返回（diskcache是本地sqlite讀，耗時可忽略）
+        cache_key = None
+        if cache is not None:
+            cache_key = _cache_key('chunk', _PROMPT_VERSION, model, language, chunk)
+            try:
+                cached = cache.get(cache_key)
+            except Exception:
+                cached = None
+            if cached is not None:
+                completed += 1
+                if logger:
+                    logger.info(f"第 {chunk_index}/{total_chunks} 塊命中磁盤緩存，跳過LLM調用")
+                if pbar is not None:
+                    pbar.update(1)
+                elif show_progress:
+                    print(f"  ✓ 完成第 {chunk_index}/{total_chunks} 塊（緩存命中）")
+                return cached
+
+        system_prompt, prompt = _build_chunk_prompts(chunk, chunk_index, total_chunks, language)
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": 0.3,
+            "max_tokens": 8000,
+        }
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        }
+        if logger:
+            logger.info(f"開始總結第 {chunk_index}/{total_chunks} 塊（長度: {len(chunk)} 字符）")
+        req_start = time.monotonic()
+        try:
+            async with semaphore:
+                response = await client.post(
+                    f"{base_url}/chat/completions", headers=headers, json=payload
+                )
+            response.raise_for_status()
+            summary = response.json()["choices"][0]["message"]["content"]
+            _LATENCY_STATS.record(time.monotonic() - req_start, throttled=False)
+            if cache is not None:
+                try:
+                    cache[cache_key] = summary
+                except Exception:
+                    pass
+            completed += 1
+            if logger:
+                logger.info(f"完成第 {chunk_index}/{total_chunks} 塊的總結")
+            if pbar is not None:
+                pbar.update(1)
+            elif show_progress:
+                print(f"  ✓ 完成第 {chunk_index}/{total_chunks} 塊 ({completed}/{total_chunks})")
+            return summary
+        except Exception as exc:
+            _LATENCY_STATS.record(time.monotonic() - req_start,
+                                  throttled=_is_throttle_error(exc))
+            if logger:
+                logger.error(f"總結第 {chunk_index} 塊時發生錯誤: {exc}", exc_info=True)
+            if pbar is not None:
+                # pbar.write不會打斷進度條行
+                pbar.write(f"  ⚠️ 總結第 {chunk_index} 塊時發生錯誤: {exc}")
+                pbar.update(1)
+            else:
+                print(f"  ⚠️ 總結第 {chunk_index} 塊時發生錯誤: {exc}")
+            return f"[總結失敗: {str(exc)}]"
+
+    async with client:
+        return list(await asyncio.gather(
+            *[_one(i, s, e) for i, (s, e) in enumerate(spans, start=1)]
+        ))
 
 
 def summarize_chunk(
@@ -163,29 +745,24 @@ def summarize_chunk(
     """
     if logger:
         logger.info(f"開始總結第 {chunk_index}/{total_chunks} 塊（長度: {len(chunk)} 字符）")
-    
-    system_prompt = f"""你是一個專業的文本總結助手。你的任務是對給定的文本進行深入分析，提取並總結核心觀點和論述。
-要求：
-1. 重點總結文本中的核心觀點、論證和主張
-2. 提供具體的論證過程、案例和數據支持（如果有的話）
-3. 使用{language}進行總結
-4. 採用分段展示的方式，每個觀點或論述使用獨立段落
-5. 保持邏輯清晰，結構完整，避免過於簡化
-6. 如果文本涉及特定領域（如技術、科學、商業等），請保持專業性和準確性"""
-    
-    prompt = f"""請對以下文本（第 {chunk_index}/{total_chunks} 塊）進行深入總結，重點關注觀點和論述：
 
-{chunk}
+    # 內容尋址緩存：同樣的(塊, 模型, 語言)重跑時直接取盤上結果
+    cache = _get_summary_cache()
+    cache_key = None
+    if cache is not None:
+        cache_key = _cache_key('chunk', _PROMPT_VERSION, model, language, chunk)
+        try:
+            cached = cache.get(cache_key)
+        except Exception:
+            cached = None
+        if cached is not None:
+            if logger:
+                logger.info(f"第 {chunk_index}/{total_chunks} 塊命中磁盤緩存，跳過LLM調用")
+            return cached
 
-請按照以下要求提供總結：
-1. 提取文本中的核心觀點和主要論述
-2. 提供具體的論證過程、案例、數據或例證（如文本中包含）
-3. 使用分段展示，每個主要觀點或論述單獨成段
-4. 保持內容具體，避免過於抽象或概括
-5. 確保邏輯連貫，觀點清晰
+    system_prompt, prompt = _build_chunk_prompts(chunk, chunk_index, total_chunks, language)
 
-請開始總結："""
-    
+    start_time = time.monotonic()
     try:
         summary = chat_completion_simple(
             prompt=prompt,
@@ -195,10 +772,18 @@ def summarize_chunk(
             temperature=0.3,  # 較低的溫度以保證總結的一致性和準確性
             max_tokens=8000  # 增大输出 token 限制，充分利用 GPT-4o 的能力
         )
+        _LATENCY_STATS.record(time.monotonic() - start_time, throttled=False)
+        if cache is not None:
+            try:
+                cache[cache_key] = summary
+            except Exception:
+                pass
         if logger:
             logger.info(f"成功完成第 {chunk_index}/{total_chunks} 塊的總結（總結長度: {len(summary)} 字符）")
         return summary
     except Exception as e:
+        _LATENCY_STATS.record(time.monotonic() - start_time,
+                              throttled=_is_throttle_error(e))
         error_msg = f"總結第 {chunk_index} 塊時發生錯誤: {e}"
         if logger:
             logger.error(error_msg, exc_info=True)
@@ -206,6 +791,46 @@ def summarize_chunk(
         return f"[總結失敗: {str(e)}]"
 
 
+def _merge_summaries(
+    summaries: List[str],
+    api_key: str,
+    model: str,
+    language: str,
+    logger: Optional[logging.Logger] = None
+) -> str:
+    """
+    合併一組相鄰的分塊總結為一份中間總結（樹狀歸約的單個節點）
+
+    合併失敗時退回原樣拼接，保證信息不丟失
+    """
+    combined = "\n\n".join(
+        f"部分總結 {i+1}：\n{summary}"
+        for i, summary in enumerate(summaries)
+    )
+
+    system_prompt = _merge_system_prompt(language)
+
+    prompt = f"""以下是對一篇長文本中相鄰部分的幾份總結：
+
+{combined}
+
+請把它們合併為一份連貫、具體的總結，保留核心觀點、論證和例證，消除重複內容："""
+
+    try:
+        return chat_completion_simple(
+            prompt=prompt,
+            api_key=api_key,
+            model=model,
+            system_prompt=system_prompt,
+            temperature=0.3,
+            max_tokens=8000
+        )
+    except Exception as e:
+        if logger:
+            logger.error(f"合併中間總結時發生錯誤: {e}", exc_info=True)
+        return combined
+
+
 def summarize_text(
     text: str,
     api_key: Optional[str] = None,
@@ -216,8 +841,12 @@ def summarize_text(
     show_progress: bool = True,
     enable_async: bool = True,
     max_workers: int = 5,  # 并发总结的线程数
+    reduce_factor: int = 4,  # 樹狀歸約時每次合併的總結份數
     save_chunk_summaries: bool = True,  # 是否保存分块总结
-    output_dir: Optional[str] = None  # 输出目录，如果为None则使用默认目录
+    output_dir: Optional[str] = None,  # 输出目录，如果为None则使用默认目录
+    tokenizer=None,  # 可選的tiktoken編碼器；提供時按token數分塊
+    chunk_size_tokens: int = 25000,  # 按token分塊時每塊的最大token數
+    chunk_overlap_tokens: int = 100  # 按token分塊時塊之間的重疊token數
 ) -> str:
     """
     總結長文本的主函數
@@ -232,9 +861,14 @@ def summarize_text(
         show_progress (bool): 是否顯示進度，默認為 True
         enable_async (bool): 是否啟用異步並發總結，默認為 True
         max_workers (int): 並發總結的最大線程數，默認為 5
+        reduce_factor (int): 樹狀歸約時每次合併的總結份數，默認為 4
         save_chunk_summaries (bool): 是否保存分块总结到txt文件，默认为 True
         output_dir (str, optional): 输出目录，如果为None则使用默认的outputs目录
-    
+        tokenizer: 可選的tiktoken編碼器（如 tiktoken.encoding_for_model(model)）；
+            提供時改按token數分塊，避免字符數↔token數的估算偏差
+        chunk_size_tokens (int): 按token分塊時每塊的最大token數，默認為 25000
+        chunk_overlap_tokens (int): 按token分塊時塊之間的重疊token數，默認為 100
+
     返回:
         str: 最終的文本總結
     
@@ -282,17 +916,34 @@ def summarize_text(
     if show_progress:
         print(f"📝 正在將文本分塊（塊大小: {chunk_size}, 重疊: {chunk_overlap}）...")
     
-    chunks = split_text_into_chunks(text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    
-    if not chunks:
+    # 只物化輕量的索引區間列表，塊字符串在提交總結時才切片；
+    # 區間列表帶緩存，同一文本重跑（如換language）直接命中。
+    # 提供tokenizer時改按token數分塊，塊大小直接對齊模型的真實限制
+    if tokenizer is not None:
+        spans = _token_chunk_spans(
+            text, tokenizer, chunk_size_tokens, chunk_overlap_tokens
+        )
+    elif len(text) <= chunk_size:
+        # 短文本快路徑：注定只有一塊，連分塊器（及其緩存鍵的hash(text)
+        # 首次全文掃描）都不進，只修剪兩端空白
+        s, e = 0, len(text)
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        spans = [(s, e)] if s < e else []
+    else:
+        spans = _cached_chunk_spans(text, chunk_size, chunk_overlap)
+
+    if not spans:
         error_msg = "文本分塊失敗，未生成任何塊"
         logger.error(error_msg)
         raise ValueError(error_msg)
-    
-    total_chunks = len(chunks)
+
+    total_chunks = len(spans)
     logger.info(f"文本已分成 {total_chunks} 塊")
-    for i, chunk in enumerate(chunks, 1):
-        logger.info(f"  塊 {i}: {len(chunk)} 字符")
+    for i, (s, e) in enumerate(spans, 1):
+        logger.info(f"  塊 {i}: {e - s} 字符")
     
     if show_progress:
         print(f"✓ 文本已分成 {total_chunks} 塊\n")
@@ -303,7 +954,7 @@ def summarize_text(
         if show_progress:
             print("📊 文本較短，直接進行總結...")
         summary = summarize_chunk(
-            chunks[0],
+            text[spans[0][0]:spans[0][1]],
             chunk_index=1,
             total_chunks=1,
             api_key=api_key,
@@ -338,55 +989,160 @@ def summarize_text(
             print(f"📋 開始總結各個文本塊...\n")
     
     chunk_summaries = []
-    
-    if enable_async and total_chunks > 1:
-        # 使用線程池並發總結
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_chunk = {}
-            
-            for i, chunk in enumerate(chunks, start=1):
-                future = executor.submit(
-                    summarize_chunk,
-                    chunk,
-                    chunk_index=i,
-                    total_chunks=total_chunks,
-                    api_key=api_key,
-                    model=model,
-                    language=language,
-                    logger=logger
-                )
-                future_to_chunk[future] = i
-            
-            # 收集結果（按順序）
-            completed = 0
-            results_dict = {}  # 使用字典保存結果，以保持順序
-            
-            for future in as_completed(future_to_chunk):
-                chunk_idx = future_to_chunk[future]
-                try:
-                    summary = future.result()
-                    results_dict[chunk_idx] = summary
-                    completed += 1
-                    
-                    logger.info(f"完成第 {chunk_idx}/{total_chunks} 塊的總結")
-                    if show_progress:
-                        print(f"  ✓ 完成第 {chunk_idx}/{total_chunks} 塊 ({completed}/{total_chunks})")
-                except Exception as e:
-                    logger.error(f"總結第 {chunk_idx} 塊時發生錯誤: {e}", exc_info=True)
+    # 線程池路徑會邊流出邊寫盤；置位後跳過後面的一次性保存
+    summaries_streamed_to_file = False
+
+    # 自適應並發：按最近觀察到的延遲/限流情況調整本次調用的並發數
+    # （加性增/乘性減），max_workers只作為起點和上限的一半
+    effective_workers = _LATENCY_STATS.recommend(max_workers)
+    if effective_workers != max_workers:
+        logger.info(f"自適應並發: 按最近API表現將並發數調整為 {effective_workers}")
+
+    # 單行進度條（tqdm可用且需要顯示進度時）；worker完成只調pbar.update，
+    # 不再每塊print一行、逐次搶stdout鎖
+    pbar = None
+    if tqdm is not None and show_progress:
+        pbar = tqdm(total=total_chunks, desc="分塊總結", unit="塊")
+
+    if enable_async and total_chunks > 1 and httpx is not None:
+        # asyncio並發：單事件循環多路復用所有請求，結果天然有序
+        chunk_summaries = asyncio.run(_summarize_all_async(
+            text, spans, api_key, model, language, logger, show_progress,
+            effective_workers, pbar=pbar
+        ))
+        logger.info(f"所有 {len(chunk_summaries)} 個分塊總結已完成")
+    elif enable_async and total_chunks > 1:
+        # 線程池回退路徑（未安裝httpx時）；
+        # 復用模塊級線程池，調用結束不shutdown，線程和keep-alive連接跨調用保留。
+        # 池只增不縮，真正的並發閘門是這個信號量
+        executor = _get_executor(effective_workers)
+        gate = threading.BoundedSemaphore(effective_workers)
+
+        def _gated_summarize(chunk, **kwargs):
+            with gate:
+                return summarize_chunk(chunk, **kwargs)
+
+        future_to_chunk = {}
+
+        for i, (s, e) in enumerate(spans, start=1):
+            future = executor.submit(
+                _gated_summarize,
+                text[s:e],
+                chunk_index=i,
+                total_chunks=total_chunks,
+                api_key=api_key,
+                model=model,
+                language=language,
+                logger=logger
+            )
+            future_to_chunk[future] = i
+
+        # 流式歸約：完成的結果先進按chunk_index排序的小根堆，連續前綴
+        # 一彈出就即時寫盤並湊組提交第一層合併——map還沒全部結束，
+        # reduce已經開始跑；N份總結不再整體滯留在results_dict裡
+        do_reduce = total_chunks > reduce_factor
+        pending_heap = []
+        next_to_emit = 1
+        group = []
+        merge_futures = []
+        passthrough = []
+
+        # 分塊總結邊流出邊寫盤，文件內容與此前一次性寫入完全相同
+        sum_file = None
+        if save_chunk_summaries:
+            chunk_summary_file = output_dir / f"chunk_summaries_{timestamp}.txt"
+            try:
+                sum_file = open(chunk_summary_file, 'w', encoding='utf-8')
+                sum_file.write("=" * 60 + "\n")
+                sum_file.write("分塊總結（按順序）\n")
+                sum_file.write("=" * 60 + "\n\n")
+                sum_file.write(f"生成時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                sum_file.write(f"總塊數: {total_chunks}\n")
+                sum_file.write(f"模型: {model}\n")
+                sum_file.write(f"語言: {language}\n\n")
+                sum_file.write("=" * 60 + "\n\n")
+            except Exception as e:
+                logger.error(f"保存分塊總結時發生錯誤: {e}", exc_info=True)
+                print(f"⚠️ 保存分塊總結時發生錯誤: {e}")
+                sum_file = None
+
+        def _emit(idx, summary):
+            """按序流出一份分塊總結：寫盤 + 餵給第一層歸約"""
+            if sum_file is not None:
+                sum_file.write("=" * 60 + "\n")
+                sum_file.write(f"第 {idx} 塊總結:\n")
+                sum_file.write("=" * 60 + "\n\n")
+                sum_file.write(summary)
+                sum_file.write("\n\n")
+            if do_reduce:
+                group.append(summary)
+                if len(group) == reduce_factor:
+                    merge_futures.append(executor.submit(
+                        _merge_summaries, list(group), api_key, model, language, logger
+                    ))
+                    group.clear()
+            else:
+                passthrough.append(summary)
+
+        completed = 0
+        for future in as_completed(future_to_chunk):
+            chunk_idx = future_to_chunk[future]
+            try:
+                summary = future.result()
+                completed += 1
+
+                logger.info(f"完成第 {chunk_idx}/{total_chunks} 塊的總結")
+                if pbar is not None:
+                    pbar.update(1)
+                elif show_progress:
+                    print(f"  ✓ 完成第 {chunk_idx}/{total_chunks} 塊 ({completed}/{total_chunks})")
+            except Exception as e:
+                logger.error(f"總結第 {chunk_idx} 塊時發生錯誤: {e}", exc_info=True)
+                if pbar is not None:
+                    pbar.write(f"  ⚠️ 總結第 {chunk_idx} 塊時發生錯誤: {e}")
+                    pbar.update(1)
+                else:
                     print(f"  ⚠️ 總結第 {chunk_idx} 塊時發生錯誤: {e}")
-                    results_dict[chunk_idx] = f"[總結失敗: {str(e)}]"
-            
-            # 按順序組裝結果
-            chunk_summaries = [results_dict[i] for i in range(1, total_chunks + 1) if i in results_dict]
+                summary = f"[總結失敗: {str(e)}]"
+
+            heapq.heappush(pending_heap, (chunk_idx, summary))
+            while pending_heap and pending_heap[0][0] == next_to_emit:
+                _, ready = heapq.heappop(pending_heap)
+                _emit(next_to_emit, ready)
+                next_to_emit += 1
+
+        # 收尾：不足一組的尾巴也提交合併，保持與整批歸約相同的分組
+        if group:
+            merge_futures.append(executor.submit(
+                _merge_summaries, list(group), api_key, model, language, logger
+            ))
+            group.clear()
+
+        if sum_file is not None:
+            sum_file.close()
+            summaries_streamed_to_file = True
+            logger.info(f"分塊總結已成功保存到: {chunk_summary_file}")
+            if pbar is not None:
+                pbar.write(f"💾 分塊總結已保存到: {chunk_summary_file}")
+            elif show_progress:
+                print(f"\n💾 分塊總結已保存到: {chunk_summary_file}")
+
+        if do_reduce:
+            chunk_summaries = [f.result() for f in merge_futures]
+            logger.info(
+                f"所有 {total_chunks} 個分塊總結已完成並流式合併為 {len(chunk_summaries)} 份"
+            )
+        else:
+            chunk_summaries = passthrough
             logger.info(f"所有 {len(chunk_summaries)} 個分塊總結已完成")
     else:
-        # 順序處理
-        for i, chunk in enumerate(chunks, start=1):
-            if show_progress:
+        # 順序處理（逐塊切片，前一塊總結完即可被GC回收）
+        for i, (s, e) in enumerate(spans, start=1):
+            if pbar is None and show_progress:
                 print(f"  處理第 {i}/{total_chunks} 塊...", end=" ", flush=True)
-            
+
             summary = summarize_chunk(
-                chunk,
+                text[s:e],
                 chunk_index=i,
                 total_chunks=total_chunks,
                 api_key=api_key,
@@ -394,17 +1150,22 @@ def summarize_text(
                 language=language,
                 logger=logger
             )
-            
+
             chunk_summaries.append(summary)
             logger.info(f"完成第 {i}/{total_chunks} 塊的總結")
-            
-            if show_progress:
+
+            if pbar is not None:
+                pbar.update(1)
+            elif show_progress:
                 print("✓")
-        
+
         logger.info(f"所有 {len(chunk_summaries)} 個分塊總結已完成")
     
+    if pbar is not None:
+        pbar.close()
+
     # 保存分块总结到txt文件（按顺序）
-    if save_chunk_summaries:
+    if save_chunk_summaries and not summaries_streamed_to_file:
         chunk_summary_file = output_dir / f"chunk_summaries_{timestamp}.txt"
         logger.info(f"正在保存分塊總結到文件: {chunk_summary_file}")
         try:
@@ -432,28 +1193,43 @@ def summarize_text(
             logger.error(f"保存分塊總結時發生錯誤: {e}", exc_info=True)
             print(f"⚠️ 保存分塊總結時發生錯誤: {e}")
     
-    # 步驟 3: 合併所有塊的總結，生成最終總結
+    # 步驟 3: 樹狀歸約後生成最終總結
+    # 一次性把N份總結拼進最終prompt，長文檔時可能撐爆128k上下文，
+    # 且該調用串行在關鍵路徑上；按reduce_factor分組逐層並行合併，
+    # 關鍵路徑從O(N)個token縮到O(reduce_factor·logN)
     logger.info("步驟 3: 開始生成最終總結")
     if show_progress:
         print(f"\n📑 正在生成最終總結...")
+
+    while len(chunk_summaries) > reduce_factor:
+        groups = [
+            chunk_summaries[i:i + reduce_factor]
+            for i in range(0, len(chunk_summaries), reduce_factor)
+        ]
+        logger.info(f"樹狀歸約：{len(chunk_summaries)} 份總結並行合併為 {len(groups)} 份")
+        if show_progress:
+            print(f"  🔀 合併 {len(chunk_summaries)} 份總結為 {len(groups)} 份...")
+        executor = _get_executor(max_workers)
+        chunk_summaries = list(executor.map(
+            lambda group: _merge_summaries(group, api_key, model, language, logger),
+            groups
+        ))
+
+    # 合併剩餘（<=reduce_factor份）塊的總結作最終一擊。
+    # 直接往StringIO流式寫入，省掉N個中間f-string對象和join的二次拼接
+    buf = io.StringIO()
+    w = buf.write
+    for i, summary in enumerate(chunk_summaries, start=1):
+        if i > 1:
+            w('\n\n')
+        w('第 ')
+        w(str(i))
+        w(' 塊總結：\n')
+        w(summary)
+    combined_summaries = buf.getvalue()
     
-    # 合併所有塊的總結
-    combined_summaries = "\n\n".join([
-        f"第 {i+1} 塊總結：\n{summary}"
-        for i, summary in enumerate(chunk_summaries)
-    ])
-    
-    system_prompt = f"""你是一個專業的文本總結助手。你的任務是根據多個文本塊的總結，生成一個完整、連貫、具體的整體總結。
-要求：
-1. 整合所有塊的總結，形成一個邏輯清晰的整體總結
-2. 重點總結文本的核心觀點、論證和主張
-3. 提供具體的論證過程、案例、數據或例證
-4. 使用分段展示的方式，每個主要觀點或論述使用獨立段落
-5. 消除重複信息，但保留重要的觀點細節
-6. 保持總結的完整性和連貫性
-7. 使用{language}進行總結
-8. 確保總結能夠全面、具體地反映原文的核心內容和主要觀點"""
-    
+    system_prompt = _final_system_prompt(language)
+
     final_prompt = f"""以下是對長文本各個部分的總結：
 
 {combined_summaries}
@@ -469,6 +1245,21 @@ def summarize_text(
 
 請生成一個分段展示的詳細總結："""
     
+    # 最終總結同樣走內容尋址緩存：各分塊總結都沒變時整次重跑零LLM調用
+    cache = _get_summary_cache()
+    final_key = None
+    if cache is not None:
+        final_key = _cache_key('final', _PROMPT_VERSION, model, language, combined_summaries)
+        try:
+            cached_final = cache.get(final_key)
+        except Exception:
+            cached_final = None
+        if cached_final is not None:
+            logger.info("最終總結命中磁盤緩存，跳過LLM調用")
+            if show_progress:
+                print("✓ 總結完成（緩存命中）！\n")
+            return cached_final
+
     try:
         # 充分利用 GPT-4o 的 128k tokens 上下文，增大 max_tokens 输出限制
         logger.info("調用API生成最終總結")
@@ -481,6 +1272,12 @@ def summarize_text(
             max_tokens=16000  # 增大以充分利用 GPT-4o 的能力生成更详细的总结
         )
         
+        if cache is not None:
+            try:
+                cache[final_key] = final_summary
+            except Exception:
+                pass
+
         logger.info(f"最終總結生成成功（長度: {len(final_summary)} 字符）")
         logger.info("=" * 60)
         logger.info("長文本總結任務完成")
@@ -9,28 +9,160 @@ warnings.filterwarnings('ignore', category=UserWarning, module='torchaudio')
 warnings.filterwarnings('ignore', category=UserWarning, module='pyannote')
 
 import whisperx
+import numpy as np
+import functools
 import gc
+import heapq
+import io
 import os
 import subprocess
+import threading
 import logging
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Tuple, Callable
+from typing import Optional, Dict, Any, Iterable, List, Tuple, Callable
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 抑制 WhisperX 对齐警告
 logging.getLogger("whisperx.alignment").setLevel(logging.ERROR)
 
+# 可選的快速時長探測庫：時長就在文件頭幾KB裡，C庫直接讀頭
+# 比每次30-80ms進程啟動的ffprobe快兩個數量級；未安裝時走ffprobe
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
 
+try:
+    import mutagen
+except ImportError:
+    mutagen = None
+
+# 可選的orjson：C擴展序列化，長轉錄稿帶詞級時間戳時比標準庫
+# json.dump(indent=2)快5-10倍，且原生支持whisperx輸出裡的numpy標量
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# whisperx.load_audio 的固定采样率
+SAMPLE_RATE = 16000
+
+# 模型緩存：同一(模型, 設備, 計算類型)跨調用復用，連續轉錄多個文件時
+# 跳過每次2-5秒的模型實例化。各緩存只保留最近一個條目，避免顯存堆積；
+# 需要釋放時調用 unload_models()
+_MODEL_CACHE: Dict[tuple, Any] = {}
+_ALIGN_CACHE: Dict[tuple, Any] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+# 對齊模型緩存單獨上鎖：後台預加載對齊模型時不和Whisper模型加載搶同一把鎖
+_ALIGN_CACHE_LOCK = threading.Lock()
+
+
+def _load_model_with_fallback(
+    model_name: str,
+    device: str,
+    compute_type: str,
+    cpu_threads: int,
+    model_cache_path: str
+):
+    """加載Whisper模型；網絡失敗且有本地緩存時自動轉離線模式重試"""
+    try:
+        return whisperx.load_model(model_name, device, compute_type=compute_type, threads=cpu_threads)
+    except Exception as load_error:
+        error_str = str(load_error).lower()
+        if ('ssl' in error_str or 'connection' in error_str or 'network' in error_str) and os.path.exists(model_cache_path):
+            print("⚠ 網絡連接失敗，嘗試離線模式使用本地緩存...")
+            os.environ['HF_HUB_OFFLINE'] = '1'
+            try:
+                model = whisperx.load_model(model_name, device, compute_type=compute_type, threads=cpu_threads)
+                print("✓ 成功使用本地緩存模型")
+                return model
+            except Exception as offline_error:
+                raise Exception(f"無法從本地緩存加載模型: {offline_error}. 原始錯誤: {load_error}")
+            finally:
+                os.environ.pop('HF_HUB_OFFLINE', None)
+        raise
+
+
+def _get_model(
+    model_name: str,
+    device: str,
+    compute_type: str,
+    cpu_threads: int,
+    model_cache_path: str
+):
+    """返回緩存的Whisper模型（未命中時加載並替換掉上一個緩存條目）"""
+    key = (model_name, device, compute_type)
+    with _MODEL_CACHE_LOCK:
+        model = _MODEL_CACHE.get(key)
+        if model is None:
+            _MODEL_CACHE.clear()
+            model = _load_model_with_fallback(
+                model_name, device, compute_type, cpu_threads, model_cache_path
+            )
+            _MODEL_CACHE[key] = model
+        return model
+
+
+def _get_align_model(language_code: str, device: str):
+    """返回緩存的 (對齊模型, 元數據)（按語言+設備作鍵）"""
+    key = (language_code, device)
+    with _ALIGN_CACHE_LOCK:
+        entry = _ALIGN_CACHE.get(key)
+        if entry is None:
+            _ALIGN_CACHE.clear()
+            entry = whisperx.load_align_model(language_code=language_code, device=device)
+            _ALIGN_CACHE[key] = entry
+        return entry
+
+
+def unload_models():
+    """顯式卸載緩存的模型並回收顯存（模型默認跨調用常駐）"""
+    with _MODEL_CACHE_LOCK:
+        _MODEL_CACHE.clear()
+    with _ALIGN_CACHE_LOCK:
+        _ALIGN_CACHE.clear()
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+@functools.lru_cache(maxsize=128)
 def get_audio_duration(audio_file: str) -> float:
     """
     获取音频文件的时长（秒）
-    
+
+    优先直接读文件头（soundfile/mutagen，C级解析，微秒量級），
+    失敗再回退到 ffprobe 子進程。結果按路徑緩存：
+    split_audio_file 和 transcribe_audio 會對同一文件各查一次
+
     参数:
         audio_file (str): 音频文件路径
-    
+
     返回:
         float: 音频时长（秒）
     """
+    ext = os.path.splitext(audio_file)[1].lower()
+
+    # 快路徑1：libsndfile 支持的無損/開放格式
+    if soundfile is not None and ext in ('.wav', '.flac', '.ogg'):
+        try:
+            return float(soundfile.info(audio_file).duration)
+        except Exception:
+            pass
+
+    # 快路徑2：mutagen 解析常見有損格式的標籤頭
+    if mutagen is not None and ext in ('.mp3', '.m4a', '.aac', '.mp4', '.wma', '.opus'):
+        try:
+            meta = mutagen.File(audio_file)
+            if meta is not None and meta.info is not None:
+                return float(meta.info.length)
+        except Exception:
+            pass
+
     try:
         # 使用 ffprobe 获取音频时长
         cmd = [
@@ -102,74 +234,100 @@ def estimate_transcription_time(
 def split_audio_file(
     audio_file: str,
     chunk_duration: float = 60.0,
-    output_dir: Optional[str] = None
-) -> List[Tuple[str, float, float]]:
+    output_dir: Optional[str] = None,
+    audio: Optional[Any] = None
+) -> List[Tuple[Any, float, float]]:
     """
     将音频文件按时间分割成多个块
-    
+
+    优先在内存中切分：整个文件只解码一次成 float32 numpy 数组，
+    每个块是数组上的零拷贝切片视图。旧方案每块各起一个 ffmpeg 子进程
+    写临时 WAV、转录时再各解码一次——N 个块要付 N 次进程启动 + 2N 次
+    解码 + N 次磁盘写，全是纯开销。解码失败时回退到 ffmpeg 切文件
+
     参数:
         audio_file (str): 输入音频文件路径
         chunk_duration (float): 每块的时长（秒），默认 60 秒
-        output_dir (str, optional): 输出目录，默认为临时目录
-    
+        output_dir (str, optional): 保留参数（回退路径已改为管道流式解码，
+            不再写临时块文件）
+        audio (ndarray, optional): 已解码的完整音频（16kHz float32）；
+            提供时直接切片，不再重新解码
+
     返回:
-        List[Tuple[str, float, float]]: [(块文件路径, 开始时间, 结束时间), ...]
+        List[Tuple[Any, float, float]]: [(音频切片或块文件路径, 开始时间, 结束时间), ...]
     """
+    # 一次解码进内存（whisperx 内部就是 ffmpeg 管道输出 f32le）
+    if audio is None:
+        try:
+            audio = whisperx.load_audio(audio_file)
+        except Exception as e:
+            print(f"⚠ 解码音频失败，回退到 ffmpeg 切文件: {e}")
+            audio = None
+
+    if audio is not None:
+        duration = len(audio) / SAMPLE_RATE
+
+        if duration <= chunk_duration:
+            # 音频太短，不需要分割
+            return [(audio, 0.0, duration)]
+
+        chunks = []
+        start_time = 0.0
+        while start_time < duration:
+            end_time = min(start_time + chunk_duration, duration)
+            # 零拷贝切片视图，不复制样本数据
+            chunk_audio = audio[int(start_time * SAMPLE_RATE):int(end_time * SAMPLE_RATE)]
+            chunks.append((chunk_audio, start_time, end_time))
+            start_time = end_time
+        return chunks
+
+    # ffmpeg 回退路径：单个长驻 ffmpeg 进程顺序流式解码 f32le，
+    # 按块大小从管道读样本。旧方案每块起一个进程写临时 WAV——
+    # N 次进程启动 + N 次磁盘写 + 转录时 N 次重新解码，全省掉
     duration = get_audio_duration(audio_file)
-    
+
     if duration == 0:
         # 如果无法获取时长，返回原文件
         return [(audio_file, 0.0, duration)]
-    
+
     if duration <= chunk_duration:
         # 音频太短，不需要分割
         return [(audio_file, 0.0, duration)]
-    
-    if output_dir is None:
-        output_dir = os.path.dirname(os.path.abspath(audio_file))
-    
-    Path(output_dir).mkdir(parents=True, exist_ok=True)
-    
+
     chunks = []
-    base_name = Path(audio_file).stem
-    chunk_index = 0
-    
-    start_time = 0.0
-    
-    while start_time < duration:
-        end_time = min(start_time + chunk_duration, duration)
-        
-        # 使用 ffmpeg 切割音频
-        chunk_file = os.path.join(output_dir, f"{base_name}_chunk_{chunk_index:04d}.wav")
-        
-        try:
-            cmd = [
-                'ffmpeg', '-i', audio_file,
-                '-ss', str(start_time),
-                '-t', str(end_time - start_time),
-                '-acodec', 'pcm_s16le',
-                '-ar', '16000',
-                '-ac', '1',
-                '-y',  # 覆盖已存在文件
-                chunk_file
-            ]
-            subprocess.run(cmd, capture_output=True, check=True)
-            chunks.append((chunk_file, start_time, end_time))
-        except (subprocess.CalledProcessError, FileNotFoundError) as e:
-            print(f"⚠ 切割音频块失败: {e}")
-            # 如果 ffmpeg 不可用，返回原文件
-            if chunk_index == 0:
-                return [(audio_file, 0.0, duration)]
-            break
-        
-        start_time = end_time
-        chunk_index += 1
-    
+    bytes_per_chunk = int(chunk_duration * SAMPLE_RATE) * 4  # float32 每样本4字节
+
+    try:
+        cmd = [
+            'ffmpeg', '-nostdin', '-i', audio_file,
+            '-f', 'f32le', '-ar', str(SAMPLE_RATE), '-ac', '1',
+            'pipe:1'
+        ]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        start_time = 0.0
+        while True:
+            data = proc.stdout.read(bytes_per_chunk)
+            if not data:
+                break
+            # bytearray 复制一次换来可写数组（后续 pin_memory 需要）
+            chunk_audio = np.frombuffer(bytearray(data), dtype=np.float32)
+            end_time = start_time + len(chunk_audio) / SAMPLE_RATE
+            chunks.append((chunk_audio, start_time, end_time))
+            start_time = end_time
+        proc.stdout.close()
+        proc.wait()
+    except (OSError, FileNotFoundError) as e:
+        print(f"⚠ 切割音频块失败: {e}")
+        # 如果 ffmpeg 不可用，返回原文件
+        return [(audio_file, 0.0, duration)]
+
+    if not chunks:
+        return [(audio_file, 0.0, duration)]
     return chunks
 
 
 def transcribe_chunk(
-    chunk_file: str,
+    chunk: Any,
     chunk_start: float,
     model,
     model_name: str,
@@ -178,14 +336,20 @@ def transcribe_chunk(
     language: Optional[str],
     align_model: Optional[Any],
     align_metadata: Optional[Any],
-    audio_data: Any
+    audio_data: Any,
+    precomputed_result: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """
     转录单个音频块
-    
+
+    返回的时间戳是块内相对时间；统一的 chunk_start 偏移在
+    merge_transcription_results 合并时应用一次。旧版在对齐前后各
+    偏移一遍，对齐抛异常时段落会被偏移两次
+
     参数:
-        chunk_file (str): 音频块文件路径
-        chunk_start (float): 块的起始时间（用于调整时间戳）
+        chunk: 已解码的音频切片（16kHz float32 ndarray），
+            或音频块文件路径（ffmpeg 回退路径）
+        chunk_start (float): 块的起始时间（仅用于错误提示）
         model: WhisperX 模型对象
         model_name (str): 模型名称
         device (str): 设备类型
@@ -194,37 +358,34 @@ def transcribe_chunk(
         align_model: 对齐模型
         align_metadata: 对齐元数据
         audio_data: 音频数据
-    
+        precomputed_result (dict, optional): 已有的转录结果（如语言检测时
+            产出的第一块结果），提供时跳过transcribe只做对齐
+
     返回:
         dict: 转录结果
     """
     try:
-        # 加载音频块
-        chunk_audio = whisperx.load_audio(chunk_file)
-        
-        # 转录
-        result = model.transcribe(chunk_audio, batch_size=batch_size, language=language)
-        
-        # 调整时间戳（加上块的起始时间）
-        for segment in result['segments']:
-            segment['start'] += chunk_start
-            segment['end'] += chunk_start
-            
-            # 调整词级时间戳
-            if 'words' in segment:
-                for word in segment['words']:
-                    word['start'] += chunk_start
-                    word['end'] += chunk_start
-        
+        # 内存切片直接用；只有 ffmpeg 回退的文件路径才需要再解码
+        chunk_audio = whisperx.load_audio(chunk) if isinstance(chunk, str) else chunk
+
+        # 转录（时间戳保持块内相对，偏移在合并阶段统一应用）
+        if precomputed_result is not None:
+            result = precomputed_result
+        else:
+            result = model.transcribe(chunk_audio, batch_size=batch_size, language=language)
+
         # 对齐时间戳（如果提供了对齐模型）
         if align_model and align_metadata:
             try:
-                # 过滤掉空文本或无效的段落
-                valid_segments = [
-                    seg for seg in result["segments"]
-                    if seg.get('text', '').strip() and len(seg.get('text', '').strip()) > 0
-                ]
-                
+                # 过滤掉空文本段落：strip一次并就地回写，下游写出时
+                # 不必对同一段文本反复strip
+                valid_segments = []
+                for seg in result["segments"]:
+                    text = seg.get('text', '').strip()
+                    if text:
+                        seg['text'] = text
+                        valid_segments.append(seg)
+
                 if valid_segments:
                     aligned_result = whisperx.align(
                         valid_segments,
@@ -246,55 +407,58 @@ def transcribe_chunk(
                 print(f"⚠ 对齐失败，使用原始转录结果: {align_error}")
                 # 移除可能存在的无效词级时间戳
                 for segment in result['segments']:
-                    if 'words' in segment:
+                    words = segment.get('words')
+                    if words:
                         # 只保留有效的词级时间戳
                         segment['words'] = [
-                            w for w in segment.get('words', [])
+                            w for w in words
                             if w.get('word', '').strip() and w.get('start', 0) >= 0 and w.get('end', 0) > w.get('start', 0)
                         ]
-            
-            # 调整对齐后的时间戳
-            for segment in result.get('segments', []):
-                segment['start'] += chunk_start
-                segment['end'] += chunk_start
-                if 'words' in segment:
-                    for word in segment['words']:
-                        word['start'] += chunk_start
-                        word['end'] += chunk_start
-        
+
         return result
     except Exception as e:
-        print(f"⚠ 转录块失败 {chunk_file}: {e}")
+        print(f"⚠ 转录块失败（起始 {chunk_start:.1f} 秒）: {e}")
         return {'segments': [], 'language': language or 'unknown'}
 
 
-def merge_transcription_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+def merge_transcription_results(results: List[Tuple[Dict[str, Any], float]]) -> Dict[str, Any]:
     """
-    合并多个转录结果
-    
+    合并多个转录结果，并统一应用各块的起始时间偏移
+
     参数:
-        results (List[Dict[str, Any]]): 多个转录结果列表
-    
+        results: [(转录结果, 块起始时间), ...]，结果内时间戳为块内相对时间
+
     返回:
-        dict: 合并后的转录结果
+        dict: 合并后的转录结果（时间戳为全局绝对时间）
     """
     if not results:
         return {'segments': [], 'language': 'unknown'}
-    
+
     merged = {
         'segments': [],
-        'language': results[0].get('language', 'unknown')
+        'language': results[0][0].get('language', 'unknown')
     }
-    
-    # 按时间戳排序并合并所有段落
-    all_segments = []
-    for result in results:
-        all_segments.extend(result.get('segments', []))
-    
-    # 按开始时间排序
-    all_segments.sort(key=lambda x: x.get('start', 0))
-    
-    merged['segments'] = all_segments
+
+    # 合并所有段落，偏移在这里恰好应用一次
+    sorted_runs = []
+    for result, chunk_start in results:
+        run = result.get('segments', [])
+        for segment in run:
+            segment['start'] = segment.get('start', 0) + chunk_start
+            segment['end'] = segment.get('end', 0) + chunk_start
+            # 單次查找代替 'words' in segment + segment['words'] 的兩次哈希
+            words = segment.get('words')
+            if words:
+                for word in words:
+                    if 'start' in word:
+                        word['start'] += chunk_start
+                    if 'end' in word:
+                        word['end'] += chunk_start
+        sorted_runs.append(run)
+
+    # 每块内部已按开始时间有序（加常量偏移不改变顺序），
+    # k路归并即可，免去对整个扁平列表重新排序
+    merged['segments'] = list(heapq.merge(*sorted_runs, key=lambda s: s.get('start', 0)))
     return merged
 
 
@@ -312,7 +476,8 @@ def transcribe_audio(
     enable_chunking: bool = True,
     chunk_duration: float = 60.0,
     max_workers: int = 4,
-    progress_callback: Optional[Callable[[int, int, str], None]] = None
+    progress_callback: Optional[Callable[[int, int, str], None]] = None,
+    output_formats: Iterable[str] = ('txt', 'srt', 'json')
 ) -> Dict[str, Any]:
     """
     使用WhisperX轉錄音頻文件
@@ -330,9 +495,11 @@ def transcribe_audio(
         highlight_words (bool): 是否在SRT文件中高亮詞級時間戳
         enable_chunking (bool): 是否啟用分塊轉錄加速，默認為 True
         chunk_duration (float): 每塊的時長（秒），默認為 60.0
-        max_workers (int): 並發轉錄的最大線程數，默認為 4
+        max_workers (int): 保留參數（分塊轉錄已改為批量推理，不再使用線程池）
         progress_callback (callable, optional): 進度回調函數，接收 (current, total, message) 參數
-    
+        output_formats (Iterable[str]): 要保存的輸出格式（'txt'/'srt'/'json'），
+            只讀txt/srt的調用方跳過JSON能省下最大一筆序列化開銷
+
     返回:
         dict: 包含轉錄結果的字典，包含 'duration' 和 'estimated_time' 字段
     """
@@ -402,6 +569,9 @@ def transcribe_audio(
         if os.path.exists(model_cache_path):
             print(f"✓ 發現本地模型緩存，使用緩存中的模型...")
             os.environ.setdefault('HF_HUB_DOWNLOAD_TIMEOUT', '300')
+
+        # CPU推理線程數：CTranslate2超過~6線程反而因核心超賣變慢
+        cpu_threads = min(6, os.cpu_count() or 1)
         
         # 決定是否使用分塊轉錄
         should_chunk = enable_chunking and audio_duration > chunk_duration * 1.5  # 只有當時長超過1.5倍塊大小時才分塊
@@ -409,71 +579,102 @@ def transcribe_audio(
         if should_chunk:
             print(f"\n[使用分塊轉錄] 音頻時長 {audio_duration:.1f} 秒，將分塊處理...")
             
-            # 1. 切割音頻
+            # 1. 整個文件解碼一次，塊是數組上的零拷貝切片
             if progress_callback:
                 progress_callback(0, 100, "正在切割音頻文件...")
-            chunks = split_audio_file(audio_file, chunk_duration, output_dir)
+            try:
+                full_audio = whisperx.load_audio(audio_file)
+            except Exception as decode_error:
+                print(f"⚠ 解碼音頻失敗: {decode_error}")
+                full_audio = None
+            chunks = split_audio_file(audio_file, chunk_duration, output_dir, audio=full_audio)
             print(f"✓ 已切割成 {len(chunks)} 個塊")
             
             if progress_callback:
                 progress_callback(10, 100, f"已切割成 {len(chunks)} 個塊，開始並發轉錄...")
             
-            # 2. 加載模型（共享模型對象，但需要注意線程安全）
+            # 2. 加載模型（跨調用緩存，連續轉錄多個文件只加載一次）。
+            # 語言已知時同時在後台線程加載對齊模型，兩次加載互相重疊
             print("\n[1/3] 正在加載模型...")
-            model = None
-            try:
-                model = whisperx.load_model(model_name, device, compute_type=compute_type)
-            except Exception as load_error:
-                error_str = str(load_error).lower()
-                if ('ssl' in error_str or 'connection' in error_str or 'network' in error_str) and os.path.exists(model_cache_path):
-                    print("⚠ 網絡連接失敗，嘗試離線模式使用本地緩存...")
-                    os.environ['HF_HUB_OFFLINE'] = '1'
-                    try:
-                        model = whisperx.load_model(model_name, device, compute_type=compute_type)
-                        os.environ.pop('HF_HUB_OFFLINE', None)
-                        print("✓ 成功使用本地緩存模型")
-                    except Exception as offline_error:
-                        os.environ.pop('HF_HUB_OFFLINE', None)
-                        raise Exception(f"無法從本地緩存加載模型: {offline_error}. 原始錯誤: {load_error}")
-                else:
-                    raise
-            
-            # 3. 先轉錄第一個塊來檢測語言（如果未指定）
+            align_future = None
+            align_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='align-load')
+            if language:
+                align_future = align_loader.submit(_get_align_model, language, device)
+
+            model = _get_model(model_name, device, compute_type, cpu_threads, model_cache_path)
+
+            # 3. 先轉錄第一個塊來檢測語言（如果未指定）。
+            # 這份結果會在主循環裡直接復用，不再為塊0白做一次轉錄
             detected_language = language
+            first_result = None
             if not detected_language and chunks:
-                first_chunk_audio = whisperx.load_audio(chunks[0][0])
+                first_chunk = chunks[0][0]
+                first_chunk_audio = (
+                    whisperx.load_audio(first_chunk) if isinstance(first_chunk, str)
+                    else first_chunk
+                )
                 first_result = model.transcribe(first_chunk_audio, batch_size=batch_size)
                 detected_language = first_result.get('language', 'unknown')
                 print(f"檢測到的語言: {detected_language}")
-            
-            # 4. 加載對齊模型（如果需要對齊）
+                # 語言一確定就開始後台加載對齊模型
+                align_future = align_loader.submit(_get_align_model, detected_language, device)
+
+            # 4. 取回對齊模型（首次使用前兌現後台加載結果）
             model_a = None
             align_metadata = None
-            if detected_language:
+            if align_future is not None:
                 try:
-                    model_a, align_metadata = whisperx.load_align_model(
-                        language_code=detected_language,
-                        device=device
-                    )
+                    model_a, align_metadata = align_future.result()
                 except Exception as e:
                     print(f"⚠ 無法加載對齊模型: {e}，跳過詞級對齊")
                     model_a = None
                     align_metadata = None
+            align_loader.shutdown(wait=False)
             
-            # 5. 並發轉錄所有塊
-            print(f"\n[2/3] 正在並發轉錄 {len(chunks)} 個音頻塊（最大 {max_workers} 個線程）...")
+            # 5. 順序批量轉錄所有塊
+            # 多個線程對同一個CTranslate2模型調transcribe並不真並行：
+            # CPU上互相搶核心（線程超賣反而更慢），CUDA上也在模型內部
+            # 排隊。改為單生產者循環，並行度交給model.transcribe的原生
+            # batch_size窗口批推理和模型的cpu_threads
+            print(f"\n[2/3] 正在批量轉錄 {len(chunks)} 個音頻塊（batch_size={batch_size}）...")
             results = []
+            # 只有 ffmpeg 回退路徑才產生需要清理的臨時文件
             chunk_files_to_cleanup = []
-            
-            # 使用線程池並發轉錄
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_chunk = {}
-                
-                for idx, (chunk_file, chunk_start, chunk_end) in enumerate(chunks):
-                    chunk_files_to_cleanup.append(chunk_file)
-                    future = executor.submit(
-                        transcribe_chunk,
-                        chunk_file,
+
+            # CUDA下預取時順便把塊拷進頁鎖定（pinned）內存：可分頁內存的
+            # H2D拷貝要走驅動的中轉緩衝，頁鎖定後直接DMA，拷貝約快一倍
+            _torch = None
+            if device == "cuda":
+                try:
+                    import torch as _torch
+                except ImportError:
+                    _torch = None
+
+            # 流水線預取：轉錄塊 i 的同時在後台線程準備塊 i+1 的音頻。
+            # 內存切片路徑準備是零成本；ffmpeg 回退路徑每塊要一次子進程
+            # 解碼，藏到模型推理背後可以把解碼時間完全隱藏掉
+            def _prepare_chunk(chunk_data):
+                chunk_audio = whisperx.load_audio(chunk_data) if isinstance(chunk_data, str) else chunk_data
+                if _torch is not None:
+                    try:
+                        # pin_memory()拷貝到頁鎖定緩衝，.numpy()取同一塊
+                        # 存儲的視圖；拷貝本身發生在預取線程上，不佔主循環
+                        chunk_audio = _torch.from_numpy(chunk_audio).pin_memory().numpy()
+                    except Exception:
+                        pass
+                return chunk_audio
+
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch') as prefetch_pool:
+                next_future = prefetch_pool.submit(_prepare_chunk, chunks[0][0])
+
+                for idx, (chunk_data, chunk_start, chunk_end) in enumerate(chunks):
+                    if isinstance(chunk_data, str):
+                        chunk_files_to_cleanup.append(chunk_data)
+                    chunk_audio = next_future.result()
+                    if idx + 1 < len(chunks):
+                        next_future = prefetch_pool.submit(_prepare_chunk, chunks[idx + 1][0])
+                    chunk_result = transcribe_chunk(
+                        chunk_audio,
                         chunk_start,
                         model,
                         model_name,
@@ -482,29 +683,19 @@ def transcribe_audio(
                         detected_language,
                         model_a,
                         align_metadata,
-                        None  # 不使用原音頻數據
+                        None,  # 不使用原音頻數據
+                        precomputed_result=first_result if idx == 0 else None
                     )
-                    future_to_chunk[future] = (idx, chunk_start)
-                
-                # 收集結果
-                completed = 0
-                for future in as_completed(future_to_chunk):
-                    idx, chunk_start = future_to_chunk[future]
-                    try:
-                        chunk_result = future.result()
-                        results.append(chunk_result)
-                        completed += 1
-                        
-                        if progress_callback:
-                            progress = 20 + int((completed / len(chunks)) * 50)
-                            progress_callback(
-                                progress,
-                                100,
-                                f"已轉錄 {completed}/{len(chunks)} 個塊 ({completed/len(chunks)*100:.1f}%)"
-                            )
-                        print(f"✓ 塊 {idx + 1}/{len(chunks)} 轉錄完成")
-                    except Exception as e:
-                        print(f"⚠ 塊 {idx + 1} 轉錄失敗: {e}")
+                    results.append((chunk_result, chunk_start))
+
+                    if progress_callback:
+                        progress = 20 + int(((idx + 1) / len(chunks)) * 50)
+                        progress_callback(
+                            progress,
+                            100,
+                            f"已轉錄 {idx + 1}/{len(chunks)} 個塊 ({(idx + 1)/len(chunks)*100:.1f}%)"
+                        )
+                    print(f"✓ 塊 {idx + 1}/{len(chunks)} 轉錄完成")
             
             # 清理臨時文件
             for chunk_file in chunk_files_to_cleanup:
@@ -518,18 +709,7 @@ def transcribe_audio(
             print("\n[3/3] 正在合併轉錄結果...")
             result = merge_transcription_results(results)
             result['language'] = detected_language or 'unknown'
-            
-            # 清理模型內存
-            if device == "cuda":
-                gc.collect()
-                import torch
-                torch.cuda.empty_cache()
-            
-            if model:
-                del model
-            if model_a:
-                del model_a
-            
+
             print(f"合併後的段落數: {len(result['segments'])}")
             
             # 7. 說話人分離（如果啟用，需要在完整音頻上進行）
@@ -540,8 +720,9 @@ def transcribe_audio(
                 else:
                     print("\n[4/4] 正在進行說話人分離（需要在完整音頻上執行）...")
                     from whisperx.diarize import DiarizationPipeline
-                    
-                    audio = whisperx.load_audio(audio_file)
+
+                    # 復用分塊時解碼好的完整音頻，免去又一次全文件ffmpeg解碼
+                    audio = full_audio if full_audio is not None else whisperx.load_audio(audio_file)
                     diarize_model = DiarizationPipeline(
                         use_auth_token=hf_token,
                         device=device
@@ -558,124 +739,100 @@ def transcribe_audio(
             # 1. 加載模型並轉錄
             print("\n[1/3] 正在加載模型並轉錄...")
             
-        model = None
-        try:
-            model = whisperx.load_model(model_name, device, compute_type=compute_type)
-        except Exception as load_error:
-            error_str = str(load_error).lower()
-            if ('ssl' in error_str or 'connection' in error_str or 'network' in error_str) and os.path.exists(model_cache_path):
-                print("⚠ 網絡連接失敗，嘗試離線模式使用本地緩存...")
-                os.environ['HF_HUB_OFFLINE'] = '1'
-                try:
-                    model = whisperx.load_model(model_name, device, compute_type=compute_type)
-                    os.environ.pop('HF_HUB_OFFLINE', None)
-                    print("✓ 成功使用本地緩存模型")
-                except Exception as offline_error:
-                    os.environ.pop('HF_HUB_OFFLINE', None)
-                    raise Exception(f"無法從本地緩存加載模型: {offline_error}. 原始錯誤: {load_error}")
-            else:
-                raise
-        
-        audio = whisperx.load_audio(audio_file)
-        result = model.transcribe(audio, batch_size=batch_size, language=language)
-        
-        print(f"檢測到的語言: {result['language']}")
-        print(f"轉錄段落數: {len(result['segments'])}")
-        
-        # 清理模型內存（如果使用GPU）
-        if device == "cuda":
-            gc.collect()
-            import torch
-            torch.cuda.empty_cache()
-            del model
-        
-        # 2. 對齊時間戳（詞級別）
-        print("\n[2/3] 正在對齊詞級時間戳...")
-        model_a = None
-        try:
-            model_a, metadata = whisperx.load_align_model(
-                language_code=result["language"], 
-                device=device
-            )
-            
-            # 过滤掉空文本或无效的段落
-            valid_segments = [
-                seg for seg in result["segments"]
-                if seg.get('text', '').strip() and len(seg.get('text', '').strip()) > 0
-            ]
-            
-            if valid_segments:
-                aligned_result = whisperx.align(
-                    valid_segments, 
-                    model_a, 
-                    metadata, 
-                    audio, 
-                    device,
-                    return_char_alignments=False
-                )
-                
-                # 合并对齐后的段落和未对齐的段落
-                aligned_segments = aligned_result.get('segments', [])
-                aligned_texts = {seg.get('text', '').strip() for seg in aligned_segments if seg.get('text', '').strip()}
-                
-                # 保留无法对齐的段落（没有文本匹配的）
-                for seg in result["segments"]:
-                    if seg.get('text', '').strip() not in aligned_texts:
-                        aligned_segments.append(seg)
-                
-                result['segments'] = aligned_segments
-                print(f"✓ 對齊完成: {len([s for s in aligned_segments if 'words' in s])} 個段落有詞級時間戳")
-            else:
-                print("⚠ 沒有有效段落需要對齊")
-                
-        except Exception as align_error:
-            print(f"⚠ 對齊過程出錯，使用原始轉錄結果: {align_error}")
-            # 保持原始结果，不影响后续处理
-            pass
-        
-        print(f"對齊後的段落數: {len(result.get('segments', []))}")
+            model = _get_model(model_name, device, compute_type, cpu_threads, model_cache_path)
+
+
+            audio = whisperx.load_audio(audio_file)
+            result = model.transcribe(audio, batch_size=batch_size, language=language)
         
-        # 清理對齊模型內存
-        if model_a:
-            if device == "cuda":
-                gc.collect()
-                import torch
-                torch.cuda.empty_cache()
-            
+            print(f"檢測到的語言: {result['language']}")
+            print(f"轉錄段落數: {len(result['segments'])}")
+
+            # 2. 對齊時間戳（詞級別）
+            print("\n[2/3] 正在對齊詞級時間戳...")
+            model_a = None
             try:
-                del model_a
-            except:
+                model_a, metadata = _get_align_model(result["language"], device)
+
+
+                # 过滤掉空文本或无效的段落，记下送去对齐的原始索引。
+                # strip一次并就地回写，下游写出时不必反复strip
+                valid_segments = []
+                valid_idx = set()
+                for i, seg in enumerate(result["segments"]):
+                    text = seg.get('text', '').strip()
+                    if text:
+                        seg['text'] = text
+                        valid_segments.append(seg)
+                        valid_idx.add(i)
+
+                if valid_segments:
+                    aligned_result = whisperx.align(
+                        valid_segments,
+                        model_a,
+                        metadata,
+                        audio,
+                        device,
+                        return_char_alignments=False
+                    )
+
+                    # 合并对齐后的段落和未对齐的段落。按位置索引补回，
+                    # 不再用文本做键——旧方案文本相同的段落只要有一条
+                    # 对齐成功，其余几条全被误删，且每次查找都要重新strip
+                    aligned_segments = aligned_result.get('segments', valid_segments)
+
+                    # 对齐输出与输入按位置一一对应；万一对齐丢了尾部段落，
+                    # 把未覆盖的输入段落补回
+                    if len(aligned_segments) < len(valid_segments):
+                        aligned_segments.extend(valid_segments[len(aligned_segments):])
+
+                    # 被过滤掉（空文本）的段落按原索引补回
+                    for i, seg in enumerate(result["segments"]):
+                        if i not in valid_idx:
+                            aligned_segments.append(seg)
+
+                    result['segments'] = aligned_segments
+                    print(f"✓ 對齊完成: {len([s for s in aligned_segments if 'words' in s])} 個段落有詞級時間戳")
+                else:
+                    print("⚠ 沒有有效段落需要對齊")
+                
+            except Exception as align_error:
+                print(f"⚠ 對齊過程出錯，使用原始轉錄結果: {align_error}")
+                # 保持原始结果，不影响后续处理
                 pass
         
-        # 3. 說話人分離（可選）
-        if diarize:
-            if hf_token is None:
-                print("⚠ 警告: 需要HuggingFace token才能進行說話人分離")
-                print("   設置環境變量 HF_TOKEN 或傳入 hf_token 參數")
-                diarize = False
+            print(f"對齊後的段落數: {len(result.get('segments', []))}")
+
+            # 3. 說話人分離（可選）
+            if diarize:
+                if hf_token is None:
+                    print("⚠ 警告: 需要HuggingFace token才能進行說話人分離")
+                    print("   設置環境變量 HF_TOKEN 或傳入 hf_token 參數")
+                    diarize = False
         
-        if diarize:
-            print("\n[3/3] 正在進行說話人分離...")
-            from whisperx.diarize import DiarizationPipeline
+            if diarize:
+                print("\n[3/3] 正在進行說話人分離...")
+                from whisperx.diarize import DiarizationPipeline
             
-            diarize_model = DiarizationPipeline(
-                use_auth_token=hf_token,
-                device=device
-            )
-            diarize_segments = diarize_model(audio)
-            result = whisperx.assign_word_speakers(diarize_segments, result)
+                diarize_model = DiarizationPipeline(
+                    use_auth_token=hf_token,
+                    device=device
+                )
+                diarize_segments = diarize_model(audio)
+                result = whisperx.assign_word_speakers(diarize_segments, result)
             
-            print(f"檢測到的說話人數量: {len(set([seg.get('speaker', 'UNKNOWN') for seg in diarize_segments]))}")
-        else:
-            print("\n[3/3] 跳過說話人分離")
+                print(f"檢測到的說話人數量: {len(set([seg.get('speaker', 'UNKNOWN') for seg in diarize_segments]))}")
+            else:
+                print("\n[3/3] 跳過說話人分離")
         
         # 保存結果
         base_name = Path(audio_file).stem
         output_path = save_transcription_result(
-            result, 
-            output_dir, 
+            result,
+            output_dir,
             base_name,
-            highlight_words=highlight_words
+            highlight_words=highlight_words,
+            formats=output_formats
         )
         
         result['output_file'] = output_path
@@ -696,75 +853,111 @@ def save_transcription_result(
     result: Dict[str, Any],
     output_dir: str,
     base_name: str,
-    highlight_words: bool = False
+    highlight_words: bool = False,
+    formats: Iterable[str] = ('txt', 'srt', 'json')
 ) -> str:
     """
     保存轉錄結果為多種格式
-    
+
     參數:
         result: WhisperX轉錄結果
         output_dir: 輸出目錄
         base_name: 基礎文件名
         highlight_words: 是否在SRT中高亮詞級時間戳
-    
+        formats: 要寫出的格式子集（'txt'/'srt'/'json'）。JSON帶全部
+            詞級時間戳，是最大最慢的輸出，不需要時跳過能省1-3秒
+
     返回:
         str: 主要輸出文件路徑
     """
     output_dir = Path(output_dir)
-    
-    # 1. 保存為文本文件
-    txt_file = output_dir / f"{base_name}_transcript.txt"
-    with open(txt_file, 'w', encoding='utf-8') as f:
-        for segment in result['segments']:
-            text = segment.get('text', '').strip()
-            if text:
-                f.write(text + '\n')
-    
-    # 2. 保存為SRT字幕文件
-    srt_file = output_dir / f"{base_name}_transcript.srt"
-    with open(srt_file, 'w', encoding='utf-8') as f:
+    formats = set(formats)
+    primary_file = None
+
+    # 1. 保存為文本文件（內存拼好一次性寫出，長轉錄稿免去逐行write調用）
+    if 'txt' in formats:
+        txt_file = output_dir / f"{base_name}_transcript.txt"
+        lines = [t for t in (seg.get('text', '').strip() for seg in result['segments']) if t]
+        with open(txt_file, 'w', encoding='utf-8') as f:
+            if lines:
+                f.write('\n'.join(lines) + '\n')
+        primary_file = txt_file
+
+    # 2. 保存為SRT字幕文件（同樣先在StringIO裡組裝，一次write落盤；
+    # 帶詞級高亮的長字幕有~10萬次write調用，全走緩衝IO層純屬開銷）
+    if 'srt' in formats:
+        srt_file = output_dir / f"{base_name}_transcript.srt"
+        buf = io.StringIO()
+        w = buf.write
         for idx, segment in enumerate(result['segments'], 1):
             start = format_timestamp(segment['start'])
             end = format_timestamp(segment['end'])
-            
+
             # 獲取說話人標籤（如果有的話）
             speaker = segment.get('speaker', '')
             text = segment.get('text', '').strip()
-            
-            f.write(f"{idx}\n")
-            f.write(f"{start} --> {end}\n")
+
+            w(f"{idx}\n")
+            w(f"{start} --> {end}\n")
             if speaker:
-                f.write(f"[{speaker}] {text}\n")
+                w(f"[{speaker}] {text}\n")
             else:
-                f.write(f"{text}\n")
-            f.write("\n")
-            
+                w(f"{text}\n")
+            w("\n")
+
             # 如果有詞級時間戳且啟用高亮
-            if highlight_words and 'words' in segment:
-                for word_info in segment['words']:
+            words = segment.get('words') if highlight_words else None
+            if words:
+                for word_info in words:
                     word = word_info.get('word', '')
                     word_start = format_timestamp(word_info.get('start', 0))
                     word_end = format_timestamp(word_info.get('end', 0))
-                    f.write(f"{idx}.{word_info.get('id', 0)}\n")
-                    f.write(f"{word_start} --> {word_end}\n")
-                    f.write(f"<font color=\"#ffff00\">{word}</font>\n")
-                    f.write("\n")
-    
+                    w(f"{idx}.{word_info.get('id', 0)}\n")
+                    w(f"{word_start} --> {word_end}\n")
+                    w(f"<font color=\"#ffff00\">{word}</font>\n")
+                    w("\n")
+        with open(srt_file, 'w', encoding='utf-8') as f:
+            f.write(buf.getvalue())
+        if primary_file is None:
+            primary_file = srt_file
+
     # 3. 保存為JSON文件（完整信息）
-    import json
-    json_file = output_dir / f"{base_name}_transcript.json"
-    with open(json_file, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
-    
-    return str(txt_file)
+    if 'json' in formats:
+        json_file = output_dir / f"{base_name}_transcript.json"
+        if orjson is not None:
+            try:
+                # whisperx結果裡常帶numpy標量，必須開OPT_SERIALIZE_NUMPY才走得通快路徑
+                payload = orjson.dumps(
+                    result,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                )
+                with open(json_file, 'wb') as f:
+                    f.write(payload)
+            except TypeError:
+                # orjson不認識的類型，回退到標準庫（default=str兜底）
+                import json
+                with open(json_file, 'w', encoding='utf-8') as f:
+                    json.dump(result, f, ensure_ascii=False, indent=2, default=str)
+        else:
+            import json
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+        if primary_file is None:
+            primary_file = json_file
+
+    return str(primary_file) if primary_file is not None else ''
 
 
 def format_timestamp(seconds: float) -> str:
-    """將秒數格式化為SRT時間戳格式 (HH:MM:SS,mmm)"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds % 1) * 1000)
+    """將秒數格式化為SRT時間戳格式 (HH:MM:SS,mmm)
+
+    先轉成整數毫秒再連續divmod：一次浮點乘法加三次整數除法，
+    避免舊版四次獨立的浮點取模/整除（該函數每段每詞都要調兩次）
+    """
+    ms = int(seconds * 1000)
+    hours, ms = divmod(ms, 3600_000)
+    minutes, ms = divmod(ms, 60_000)
+    secs, millis = divmod(ms, 1000)
     return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
 
 
@@ -4,29 +4,341 @@
 """
 from googletrans import Translator, LANGUAGES
 from typing import Optional, Union, List, Dict
+import asyncio
+import atexit
+import hashlib
+import itertools
+import os
+import random
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 
+# googletrans 底層用 httpx 發請求；可選引入用於精確分類異常
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# 可選的磁盤緩存（底層是SQLite）：同一文本跨進程/跨會話只翻譯一次，
+# 重跑輕微改動過的文件時幾乎零網絡開銷，也不再消耗限流配額
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+
+# 有效目標語言代碼：凍結成集合，熱路徑上查一次哈希即可
+_VALID_DESTS = frozenset(LANGUAGES)
 
 # 創建全局翻譯器實例
 _translator = None
+_TRANSLATOR_LOCK = threading.Lock()
+# 並行翻譯時每個工作線程持有自己的翻譯器（見 _get_thread_translator）
+_TLS = threading.local()
+
+
+def _build_pooled_client():
+    """構建帶連接池的httpx.Client（復用TCP+TLS連接）
+
+    googletrans每次請求只傳幾KB數據，TLS握手的1-2個RTT反而是大頭；
+    keep-alive連接池讓批量翻譯只握手一次。h2裝了就順帶開HTTP/2
+    """
+    # httpx 0.14起才有Limits/limits=；googletrans鎖定的0.13.x
+    # 用PoolLimits/pool_limits=的舊拼法
+    if getattr(httpx, 'Limits', None) is not None:
+        pool_kwargs = {'limits': httpx.Limits(max_keepalive_connections=16, max_connections=32)}
+    else:
+        pool_kwargs = {'pool_limits': httpx.PoolLimits(soft_limit=16, hard_limit=32)}
+    try:
+        return httpx.Client(http2=True, timeout=10.0, **pool_kwargs)
+    except ImportError:
+        # 未安裝h2擴展，退回HTTP/1.1（連接池照樣生效）
+        return httpx.Client(timeout=10.0, **pool_kwargs)
+
+
+def _is_recoverable_error(exc: Exception) -> bool:
+    """判斷翻譯異常是否值得重試（瞬時網絡錯誤、限流、服務端錯誤）"""
+    if httpx is not None:
+        # httpx 0.14起才有頂層HTTPStatusError/TransportError；googletrans
+        # 鎖定的0.13.x把異常放在httpx.exceptions下且名字不同，按版本探測
+        status_cls = getattr(httpx, 'HTTPStatusError', None)
+        if status_cls is not None and isinstance(exc, status_cls):
+            code = exc.response.status_code
+            # 429和5xx是服務端瞬時問題；其餘4xx重試也不會變好
+            return code == 429 or code >= 500
+        transport_cls = getattr(httpx, 'TransportError', None)
+        if transport_cls is not None and isinstance(exc, transport_cls):
+            return True
+        exc_mod = getattr(httpx, 'exceptions', None)
+        if exc_mod is not None:
+            for name in ('TimeoutException', 'NetworkError'):
+                cls = getattr(exc_mod, name, None)
+                if cls is not None and isinstance(exc, cls):
+                    return True
+            http_err_cls = getattr(exc_mod, 'HTTPError', None)
+            if http_err_cls is not None and isinstance(exc, http_err_cls):
+                response = getattr(exc, 'response', None)
+                if response is not None:
+                    code = response.status_code
+                    return code == 429 or code >= 500
+    error_str = str(exc).lower()
+    return any(marker in error_str for marker in (
+        'nonetype', 'json', 'timeout', 'connection', 'too many requests', '429'
+    ))
+
+
+def _backoff_delay(
+    attempt: int,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    jitter: float = 0.5
+) -> float:
+    """帶抖動的指數退避延遲：base * 2^attempt * (1 + random*jitter)，封頂max_delay
+
+    固定間隔重試會和服務端的冷卻窗口反覆撞車；抖動讓並發線程的
+    重試時間互相錯開，避免整批請求同時再次打到限流端點
+    """
+    return min(max_delay, base_delay * (2 ** attempt) * (1 + random.random() * jitter))
+
+
+# 磁盤翻譯緩存（懶加載；diskcache未安裝時透明跳過）
+_TRANSLATE_CACHE = None
+_TRANSLATE_CACHE_LOCK = threading.Lock()
+
+
+def _get_translate_cache():
+    """返回磁盤翻譯緩存實例，不可用時返回None"""
+    global _TRANSLATE_CACHE
+    if diskcache is None:
+        return None
+    if _TRANSLATE_CACHE is None:
+        with _TRANSLATE_CACHE_LOCK:
+            if _TRANSLATE_CACHE is None:
+                try:
+                    cache_dir = os.path.expanduser('~/.cache/translate')
+                    _TRANSLATE_CACHE = diskcache.Cache(cache_dir)
+                except Exception:
+                    return None
+    return _TRANSLATE_CACHE
+
+
+def _cache_key(text: str, dest: str, src: Optional[str]) -> str:
+    """按 (文本, 目標語言, 源語言) 生成緩存鍵"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(text.encode('utf-8'))
+    h.update(b'\x00')
+    h.update(dest.encode('utf-8'))
+    h.update(b'\x00')
+    h.update((src or 'auto').encode('utf-8'))
+    return h.hexdigest()
+
+
+def _cache_get(text: str, dest: str, src: Optional[str]):
+    cache = _get_translate_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.get(_cache_key(text, dest, src))
+    except Exception:
+        return None
+
+
+def _cache_put(text: str, dest: str, src: Optional[str], result: Dict):
+    # 只緩存真正翻譯成功的結果，失敗兜底的原文佔位不落盤
+    if result.get('src') == 'unknown':
+        return
+    cache = _get_translate_cache()
+    if cache is None:
+        return
+    try:
+        cache.set(_cache_key(text, dest, src), result)
+    except Exception:
+        pass
+
+
+# translate_file 打包翻譯用的行分隔哨兵：選翻譯服務不會當成自然語言
+# 動手改寫的符號串；單批字符預算留在googletrans單請求上限之下
+_SENTINEL = '§§§'
+_BATCH_SEPARATOR = f'\n{_SENTINEL}\n'
+_BATCH_CHAR_BUDGET = 4500
+
+
+class CircuitOpenError(Exception):
+    """熔斷器打開期間快速失敗拋出的異常"""
+
+
+class _Breaker:
+    """進程級熔斷器：服務持續限流時快速失敗，不再白付重試延遲
+
+    closed狀態正常放行；連續失敗達到閾值轉open，期間所有調用
+    立即被拒（每個剩餘批次省下 retry_count * 退避延遲 的死等）；
+    recovery_time後轉half_open放行一個探測請求，成功即重新閉合
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at >= self.recovery_time:
+                    self.state = 'half_open'
+                    return True
+                return False
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.state = 'closed'
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+_BREAKER = _Breaker()
+
+
+class _TokenBucket:
+    """簡單令牌桶限流器：按固定速率補充令牌，拿不到令牌就睡到有為止
+
+    線程數只是粗粒度的並發上限；批次短、重試密集時瞬時請求數會
+    突刺到限流線以上，整批任務吃429。令牌桶把請求速率鉚在服務端
+    實際承受的水平，突發失敗變成平穩吞吐
+    """
+
+    def __init__(self, rate_per_sec: float):
+        self.rate = rate_per_sec
+        self.capacity = max(1.0, rate_per_sec)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _validate_dest(dest: str):
+    """校驗目標語言代碼，無效時拋ValueError
+
+    錯誤信息不再把全部語言代碼拼進去（一百多項的列表構造只在
+    失敗時才值得付，提示用 get_supported_languages() 自查即可）
+    """
+    if dest not in _VALID_DESTS:
+        raise ValueError(f"不支持的目標語言: {dest}。可用 get_supported_languages() 查看支持的語言代碼")
+
+
+def _make_translator():
+    """構建一個翻譯器實例並注入帶連接池的client
+
+    googletrans 4.x暴露self.client屬性；結構對不上就保持默認client
+    """
+    translator = Translator()
+    if httpx is not None and isinstance(getattr(translator, 'client', None), httpx.Client):
+        try:
+            pooled = _build_pooled_client()
+            old_client = translator.client
+            translator.client = pooled
+            old_client.close()
+            atexit.register(pooled.close)
+        except Exception:
+            pass
+    return translator
 
 
 def get_translator():
-    """獲取翻譯器實例（單例模式）"""
+    """獲取翻譯器實例（單例模式，雙重檢查鎖保證多線程下只初始化一次）"""
     global _translator
     if _translator is None:
-        _translator = Translator()
+        with _TRANSLATOR_LOCK:
+            if _translator is None:
+                _translator = _make_translator()
     return _translator
 
 
+def _get_thread_translator():
+    """獲取當前線程專屬的翻譯器實例
+
+    所有工作線程共用一個同步client時，請求在client內部串行排隊，
+    線程開再多也只有一條在途連接；每線程一個翻譯器（各帶自己的
+    連接池）才能真正讓網絡請求並行重疊
+    """
+    translator = getattr(_TLS, 'translator', None)
+    if translator is None:
+        translator = _make_translator()
+        _TLS.translator = translator
+    return translator
+
+
+class TranslationResult:
+    """翻譯結果對象：固定五個字段，用__slots__省去每個實例的屬性字典
+
+    批量翻譯的熱循環裡每條結果都要構造一個五鍵dict；__slots__對象
+    分配更小也更快。通過__getitem__/get保持字典式取值兼容，需要
+    真正的dict（寫緩存、JSON序列化）時調用as_dict()
+    """
+
+    __slots__ = ('text', 'src', 'dest', 'pronunciation', 'original')
+
+    def __init__(self, text, src='unknown', dest='en', pronunciation=None, original=''):
+        self.text = text
+        self.src = src
+        self.dest = dest
+        self.pronunciation = pronunciation
+        self.original = original
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def as_dict(self) -> Dict:
+        return {
+            'text': self.text,
+            'src': self.src,
+            'dest': self.dest,
+            'pronunciation': self.pronunciation,
+            'original': self.original,
+        }
+
+    def __repr__(self):
+        return f"TranslationResult(text={self.text!r}, src={self.src!r}, dest={self.dest!r})"
+
+
 def translate_text(
     text: Union[str, List[str]],
     dest: str = 'en',
     src: Optional[str] = None,
     retry_count: int = 3,
-    retry_delay: float = 1.0
-) -> Union[Dict, List[Dict]]:
+    retry_delay: float = 1.0,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    jitter: float = 0.5,
+    translator: Optional[Translator] = None
+) -> Union[TranslationResult, Dict, List[TranslationResult]]:
     """
     翻譯文本到目標語言
     
@@ -35,18 +347,25 @@ def translate_text(
         dest (str): 目標語言代碼（默認 'en'），如 'zh-cn', 'ja', 'ko' 等
         src (str, optional): 源語言代碼，None為自動檢測
         retry_count (int): 重試次數（網絡問題時）
-        retry_delay (float): 重試延遲（秒）
-    
+        retry_delay (float): 保留參數（重試間隔已改為指數退避，見下方參數）
+        base_delay (float): 退避基礎延遲（秒）
+        max_delay (float): 單次退避延遲上限（秒）
+        jitter (float): 抖動比例（0為無抖動）
+        translator (Translator, optional): 指定翻譯器實例（並行路徑傳入
+            線程專屬實例），None用全局單例
+
     返回:
-        dict 或 List[dict]: 翻譯結果
-        單個文本返回: {'text': '翻譯後的文本', 'src': '源語言', 'dest': '目標語言', 'pronunciation': '發音'}
-        多個文本返回: 上述字典的列表
+        TranslationResult 或 List[TranslationResult]: 翻譯結果，支持
+        result['text']/result.get('text')的字典式取值；緩存命中時
+        返回緩存的dict（取值方式相同）
+        字段: text（譯文）、src（源語言）、dest（目標語言）、
+        pronunciation（發音）、original（原文）
     """
-    translator = get_translator()
-    
+    if translator is None:
+        translator = get_translator()
+
     # 驗證目標語言
-    if dest not in LANGUAGES:
-        raise ValueError(f"不支持的目標語言: {dest}。支持的語言: {list(LANGUAGES.keys())}")
+    _validate_dest(dest)
     
     # 處理空字符串或空列表
     if isinstance(text, list):
@@ -55,7 +374,7 @@ def translate_text(
         # 過濾掉空字符串
         filtered_texts = [t for t in text if t and t.strip()]
         if not filtered_texts:  # 列表中的所有字符串都是空的
-            return [{'text': '', 'src': 'unknown', 'dest': dest, 'pronunciation': None, 'original': ''} for _ in text]
+            return [TranslationResult('', 'unknown', dest, None, '') for _ in text]
         # 記錄原始索引以便恢復空字符串位置
         text_indices = {i: i for i in range(len(text))}
         non_empty_indices = [i for i, t in enumerate(text) if t and t.strip()]
@@ -65,8 +384,16 @@ def translate_text(
     else:
         # 單個字符串
         if not text or not text.strip():
-            return {'text': text, 'src': 'unknown', 'dest': dest, 'pronunciation': None, 'original': text}
-    
+            return TranslationResult(text, 'unknown', dest, None, text)
+        # 磁盤緩存命中直接返回，不佔網絡和限流配額
+        cached = _cache_get(text, dest, src)
+        if cached is not None:
+            return cached
+
+    # 熔斷器打開時立即失敗：既不佔網絡，也不白睡退避延遲
+    if not _BREAKER.allow():
+        raise CircuitOpenError("翻譯服務熔斷中（連續失敗過多），稍後再試")
+
     # 處理重試邏輯
     last_exception = None
     for attempt in range(retry_count):
@@ -81,44 +408,43 @@ def translate_text(
                 translated_list = []
                 for i, original in enumerate(text):
                     if not original or not original.strip():
-                        translated_list.append({
-                            'text': original,
-                            'src': 'unknown',
-                            'dest': dest,
-                            'pronunciation': None,
-                            'original': original
-                        })
+                        translated_list.append(
+                            TranslationResult(original, 'unknown', dest, None, original)
+                        )
                     else:
+                        cached = _cache_get(original, dest, src)
+                        if cached is not None:
+                            translated_list.append(cached)
+                            continue
                         try:
+                            if not _BREAKER.allow():
+                                raise CircuitOpenError("翻譯服務熔斷中")
                             single_result = translator.translate(original, **translate_kwargs)
+                            _BREAKER.record_success()
                             if single_result is None:
-                                translated_list.append({
-                                    'text': original,
-                                    'src': 'unknown',
-                                    'dest': dest,
-                                    'pronunciation': None,
-                                    'original': original
-                                })
+                                translated_list.append(
+                                    TranslationResult(original, 'unknown', dest, None, original)
+                                )
                             else:
-                                translated_list.append({
-                                    'text': getattr(single_result, 'text', original) or original,
-                                    'src': getattr(single_result, 'src', 'unknown') or 'unknown',
-                                    'dest': getattr(single_result, 'dest', dest) or dest,
-                                    'pronunciation': getattr(single_result, 'pronunciation', None),
-                                    'original': original
-                                })
+                                entry = TranslationResult(
+                                    getattr(single_result, 'text', original) or original,
+                                    getattr(single_result, 'src', 'unknown') or 'unknown',
+                                    getattr(single_result, 'dest', dest) or dest,
+                                    getattr(single_result, 'pronunciation', None),
+                                    original
+                                )
+                                translated_list.append(entry)
+                                _cache_put(original, dest, src, entry.as_dict())
                             # 添加小延遲以避免請求過快（在重試循環外減少延遲）
                             if i < len(text) - 1:
                                 time.sleep(0.1)
                         except Exception as single_error:
                             # 單個翻譯失敗，使用原文
-                            translated_list.append({
-                                'text': original,
-                                'src': 'unknown',
-                                'dest': dest,
-                                'pronunciation': None,
-                                'original': original
-                            })
+                            if not isinstance(single_error, CircuitOpenError):
+                                _BREAKER.record_failure()
+                            translated_list.append(
+                                TranslationResult(original, 'unknown', dest, None, original)
+                            )
                 
                 return translated_list
             else:
@@ -128,61 +454,130 @@ def translate_text(
                 # 檢查結果是否為 None
                 if result is None:
                     raise ValueError("翻譯返回 None，可能是網絡問題或服務器錯誤")
-                
-                return {
-                    'text': getattr(result, 'text', text) or text,
-                    'src': getattr(result, 'src', 'unknown') or 'unknown',
-                    'dest': getattr(result, 'dest', dest) or dest,
-                    'pronunciation': getattr(result, 'pronunciation', None),
-                    'original': text
-                }
+
+                _BREAKER.record_success()
+                result_obj = TranslationResult(
+                    getattr(result, 'text', text) or text,
+                    getattr(result, 'src', 'unknown') or 'unknown',
+                    getattr(result, 'dest', dest) or dest,
+                    getattr(result, 'pronunciation', None),
+                    text
+                )
+                # 緩存仍存dict：pickle穩定，不綁定本模塊的類定義
+                _cache_put(text, dest, src, result_obj.as_dict())
+                return result_obj
         
         except Exception as e:
             last_exception = e
-            error_str = str(e)
-            # 如果是 JSON NoneType 錯誤，增加延遲並重試
-            if "NoneType" in error_str or "JSON" in error_str:
-                if attempt < retry_count - 1:
-                    delay = retry_delay * (attempt + 1)  # 指數退避
-                    print(f"⚠ 翻譯失敗（可能是網絡問題），{delay}秒後重試 ({attempt + 1}/{retry_count})...")
-                    time.sleep(delay)
-                else:
-                    # 最後一次嘗試失敗
-                    if isinstance(text, list):
-                        # 批量翻譯失敗，返回原文列表
-                        print(f"⚠ 批量翻譯最終失敗，返回原文")
-                        return [
-                            {'text': t, 'src': 'unknown', 'dest': dest, 'pronunciation': None, 'original': t}
-                            for t in text
-                        ]
-                    else:
-                        # 單個翻譯失敗，返回原文
-                        print(f"⚠ 翻譯最終失敗，返回原文")
-                        return {'text': text, 'src': 'unknown', 'dest': dest, 'pronunciation': None, 'original': text}
+            _BREAKER.record_failure()
+            # 不可恢復的錯誤（非429的4xx、參數錯誤等）重試也不會變好，直接拋出
+            if not _is_recoverable_error(e):
+                raise Exception(f"翻譯失敗（不可重試的錯誤）: {e}")
+
+            # 熔斷器中途打開就不再睡退避，直接走兜底
+            if attempt < retry_count - 1 and _BREAKER.allow():
+                delay = _backoff_delay(attempt, base_delay, max_delay, jitter)
+                print(f"⚠ 翻譯失敗（可能是網絡問題），{delay:.1f}秒後重試 ({attempt + 1}/{retry_count})...")
+                time.sleep(delay)
             else:
-                if attempt < retry_count - 1:
-                    print(f"⚠ 翻譯失敗，正在重試 ({attempt + 1}/{retry_count})...")
-                    time.sleep(retry_delay)
+                # 最後一次嘗試失敗，返回原文兜底
+                if isinstance(text, list):
+                    print(f"⚠ 批量翻譯最終失敗，返回原文")
+                    return [
+                        TranslationResult(t, 'unknown', dest, None, t)
+                        for t in text
+                    ]
                 else:
-                    raise Exception(f"翻譯失敗，已重試 {retry_count} 次: {error_str}")
+                    print(f"⚠ 翻譯最終失敗，返回原文")
+                    return TranslationResult(text, 'unknown', dest, None, text)
     
     if last_exception:
         raise last_exception
 
 
+def _translate_raw(
+    text: str,
+    dest: str,
+    src: Optional[str] = None,
+    retry_count: int = 3,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    jitter: float = 0.5,
+    translator: Optional[Translator] = None
+):
+    """底層單文本翻譯：帶重試/退避/熔斷，返回googletrans原始結果對象
+
+    結果字典的構造和緩存寫入留給調用方；只要譯文字符串的熱路徑
+    （translate_text_simple）不必為每次調用付五鍵字典的構造成本
+    """
+    if translator is None:
+        translator = get_translator()
+    if not _BREAKER.allow():
+        raise CircuitOpenError("翻譯服務熔斷中（連續失敗過多），稍後再試")
+
+    translate_kwargs = {'dest': dest}
+    if src is not None:
+        translate_kwargs['src'] = src
+
+    last_exception = None
+    for attempt in range(retry_count):
+        try:
+            result = translator.translate(text, **translate_kwargs)
+            if result is None:
+                raise ValueError("翻譯返回 None，可能是網絡問題或服務器錯誤")
+            _BREAKER.record_success()
+            return result
+        except Exception as e:
+            last_exception = e
+            _BREAKER.record_failure()
+            if not _is_recoverable_error(e):
+                raise
+            if attempt < retry_count - 1 and _BREAKER.allow():
+                time.sleep(_backoff_delay(attempt, base_delay, max_delay, jitter))
+    raise last_exception
+
+
 def translate_text_simple(text: str, dest: str = 'en') -> str:
     """
     簡單版本：只返回翻譯後的文本
-    
+
+    快路徑：不經過 translate_text 的完整結果字典構造，緩存命中或
+    翻譯成功都直接返回字符串；失敗時和 translate_text 一樣返回原文
+
     參數:
         text (str): 要翻譯的文本
         dest (str): 目標語言代碼
-    
+
     返回:
         str: 翻譯後的文本
     """
-    result = translate_text(text, dest=dest)
-    return result['text']
+    if not text or not text.strip():
+        return text
+    _validate_dest(dest)
+
+    cached = _cache_get(text, dest, None)
+    if cached is not None:
+        return cached.get('text', text) if isinstance(cached, dict) else cached
+
+    try:
+        result = _translate_raw(text, dest)
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        if _is_recoverable_error(e):
+            print(f"⚠ 翻譯最終失敗，返回原文")
+            return text
+        raise
+
+    translated = getattr(result, 'text', text) or text
+    _cache_put(text, dest, None, {
+        'text': translated,
+        'src': getattr(result, 'src', 'auto') or 'auto',
+        'dest': getattr(result, 'dest', dest) or dest,
+        'pronunciation': getattr(result, 'pronunciation', None),
+        'original': text
+    })
+    return translated
 
 
 def detect_language(text: str) -> Dict[str, Union[str, float]]:
@@ -196,14 +591,19 @@ def detect_language(text: str) -> Dict[str, Union[str, float]]:
         dict: {'language': '語言代碼', 'confidence': '置信度'}
     """
     translator = get_translator()
-    try:
-        result = translator.detect(text)
-        return {
-            'language': result.lang,
-            'confidence': result.confidence if hasattr(result, 'confidence') else None
-        }
-    except Exception as e:
-        raise Exception(f"語言檢測失敗: {str(e)}")
+    retry_count = 3
+    for attempt in range(retry_count):
+        try:
+            result = translator.detect(text)
+            return {
+                'language': result.lang,
+                'confidence': result.confidence if hasattr(result, 'confidence') else None
+            }
+        except Exception as e:
+            # 和 translate_text 共用同一套重試策略
+            if not _is_recoverable_error(e) or attempt >= retry_count - 1:
+                raise Exception(f"語言檢測失敗: {str(e)}")
+            time.sleep(_backoff_delay(attempt))
 
 
 def get_supported_languages() -> Dict[str, str]:
@@ -241,40 +641,88 @@ def translate_file(
     
     if not os.path.exists(input_file):
         raise FileNotFoundError(f"文件不存在: {input_file}")
-    
-    # 讀取文件
+
+    _validate_dest(dest)  # 入口處校驗一次，批次內部不再重複檢查
+
+    # 流式逐行讀取。舊版 f.read() + content.split('\n') 同時持有整個
+    # 文件字符串和行列表兩份拷貝，大轉錄稿峰值內存翻倍；逐行迭代
+    # 只留行列表一份。結尾是否帶換行也照原樣保留
+    lines = []
+    trailing_newline = False
     with open(input_file, 'r', encoding=encoding) as f:
-        content = f.read()
-    
-    # 按行翻譯（處理較大文件）
-    lines = content.split('\n')
-    translated_lines = []
-    
+        for line in f:
+            trailing_newline = line.endswith('\n')
+            lines.append(line[:-1] if trailing_newline else line)
+    if trailing_newline or not lines:
+        lines.append('')
+
+    # 把相鄰的非空行按字符預算打包成批，一批一個請求。
+    # 逐行翻譯時每行一次HTTP往返，字幕/轉錄稿動輒幾千短行；
+    # 打包後請求數從O(行數)降到O(總字符/4500)，通常少兩個數量級
+
     print(f"正在翻譯文件: {input_file}")
     print(f"總共 {len(lines)} 行")
-    
-    for i, line in enumerate(lines, 1):
-        if line.strip():  # 跳過空行
-            try:
-                result = translate_text(line, dest=dest, src=src)
-                translated_lines.append(result['text'])
-                if i % 10 == 0:
-                    print(f"進度: {i}/{len(lines)}")
-            except Exception as e:
-                print(f"⚠ 第 {i} 行翻譯失敗: {e}")
-                translated_lines.append(line)  # 保留原文
-        else:
-            translated_lines.append('')
-    
+
+    batches = []  # [(原始行索引列表, 行內容列表)]
+    cur_idx: List[int] = []
+    cur_lines: List[str] = []
+    cur_chars = 0
+    for i, line in enumerate(lines):
+        if not line.strip():  # 空行原樣保留，不進批
+            continue
+        if cur_lines and cur_chars + len(line) + len(_BATCH_SEPARATOR) > _BATCH_CHAR_BUDGET:
+            batches.append((cur_idx, cur_lines))
+            cur_idx, cur_lines, cur_chars = [], [], 0
+        cur_idx.append(i)
+        cur_lines.append(line)
+        cur_chars += len(line) + len(_BATCH_SEPARATOR)
+    if cur_lines:
+        batches.append((cur_idx, cur_lines))
+
     # 確定輸出文件路徑
     if output_file is None:
         input_path = Path(input_file)
         output_file = str(input_path.parent / f"{input_path.stem}_translated{input_path.suffix}")
-    
-    # 寫入文件
-    with open(output_file, 'w', encoding=encoding) as f:
-        f.write('\n'.join(translated_lines))
-    
+
+    # 批次按行號順序完成，每批定稿後立刻把已定稿的行段寫出去。
+    # 舊版 '\n'.join(...) 要再拼一份完整譯文字符串才落盤，大文件
+    # 又是一份全量拷貝；流式寫出讓輸出側內存不隨文件增長
+    translated_lines = list(lines)  # 空行和翻譯失敗的行保持原樣
+    with open(output_file, 'w', encoding=encoding) as out:
+
+        def _flush(upto: int, written: int) -> int:
+            """把 [written, upto) 範圍內已定稿的行寫出，行間補換行"""
+            for j in range(written, upto):
+                if j:
+                    out.write('\n')
+                out.write(translated_lines[j])
+            return upto
+
+        written = 0
+        for n, (indices, batch) in enumerate(batches, 1):
+            joined = _BATCH_SEPARATOR.join(batch)
+            try:
+                result = translate_text(joined, dest=dest, src=src)
+                parts = result['text'].split(_SENTINEL)
+                if len(parts) != len(batch):
+                    raise ValueError("分隔符在翻譯結果中丟失，退回逐行翻譯")
+                for idx, part in zip(indices, parts):
+                    translated_lines[idx] = part.strip()
+            except Exception as e:
+                # 整批失敗（或分隔符被翻譯服務吃掉），退回逐行翻譯這一批
+                print(f"⚠ 批次 {n} 整批翻譯失敗: {e}")
+                for idx in indices:
+                    try:
+                        line_result = translate_text(lines[idx], dest=dest, src=src)
+                        translated_lines[idx] = line_result['text']
+                    except Exception as line_error:
+                        print(f"⚠ 第 {idx + 1} 行翻譯失敗: {line_error}")
+            written = _flush(indices[-1] + 1, written)
+            print(f"進度: {n}/{len(batches)} 批次")
+
+        # 收尾：最後一批之後可能還有空行
+        _flush(len(translated_lines), written)
+
     print(f"✓ 翻譯完成，已保存到: {output_file}")
     return output_file
 
@@ -283,23 +731,38 @@ def translate_list(
     texts: List[str],
     dest: str = 'en',
     src: Optional[str] = None,
-    batch_size: int = 15
+    batch_size: int = 15,
+    dedupe: bool = True
 ) -> List[str]:
     """
     翻譯文本列表（使用逐個翻譯，可選分批處理）
-    
+
     參數:
         texts (List[str]): 要翻譯的文本列表
         dest (str): 目標語言代碼
         src (str, optional): 源語言代碼
         batch_size (int): 批次大小（用於進度顯示，實際是逐個翻譯）
-    
+        dedupe (bool): 重複文本只翻譯一次再散射回原位（字幕裡的
+            口頭禪、副歌行動輒重複幾十次，白白燒配額）
+
     返回:
         List[str]: 翻譯後的文本列表
     """
     if not texts:
         return []
-    
+
+    _validate_dest(dest)  # 入口處校驗一次，批次內部不再重複檢查
+
+    # 去重：保序取唯一文本，翻譯一遍後按原位置還原
+    if dedupe:
+        unique = list(dict.fromkeys(texts))
+        if len(unique) < len(texts):
+            translated_unique = translate_list(
+                unique, dest=dest, src=src, batch_size=batch_size, dedupe=False
+            )
+            mapping = dict(zip(unique, translated_unique))
+            return [mapping[t] for t in texts]
+
     # 如果列表較小，直接翻譯
     if len(texts) <= batch_size:
         result = translate_text(texts, dest=dest, src=src)
@@ -337,29 +800,51 @@ def translate_list_parallel(
     dest: str = 'en',
     src: Optional[str] = None,
     batch_size: int = 15,
-    max_workers: int = 5
+    max_workers: int = 5,
+    rate_per_sec: float = 5.0,
+    max_in_flight: Optional[int] = None,
+    dedupe: bool = True
 ) -> List[str]:
     """
     並行翻譯文本列表（使用逐個翻譯 + 並發執行）
-    
+
     設計：
     - 統一使用逐個翻譯（避免批量翻譯的錯誤）
     - 通過多線程並發處理不同批次來提高效率
     - 每個批次內的文本逐個翻譯，但多個批次並發執行
-    
+    - 令牌桶限制請求速率、信號量限制在途請求數，與線程數解耦
+
     參數:
         texts (List[str]): 要翻譯的文本列表
         dest (str): 目標語言代碼
         src (str, optional): 源語言代碼
         batch_size (int): 每批次的文本數量（每個線程處理一個批次）
         max_workers (int): 最大並發線程數（同時處理的批次數）
-    
+        rate_per_sec (float): 全局請求速率上限（次/秒），0或None關閉限流
+        max_in_flight (int, optional): 同時在途的請求數上限，默認不限
+            （已有線程數兜底）
+        dedupe (bool): 重複文本只翻譯一次再散射回原位
+
     返回:
         List[str]: 翻譯後的文本列表（順序與輸入一致）
     """
     if not texts:
         return []
-    
+
+    _validate_dest(dest)  # 入口處校驗一次，批次內部不再重複檢查
+
+    # 去重：保序取唯一文本，翻譯一遍後按原位置還原
+    if dedupe:
+        unique = list(dict.fromkeys(texts))
+        if len(unique) < len(texts):
+            translated_unique = translate_list_parallel(
+                unique, dest=dest, src=src, batch_size=batch_size,
+                max_workers=max_workers, rate_per_sec=rate_per_sec,
+                max_in_flight=max_in_flight, dedupe=False
+            )
+            mapping = dict(zip(unique, translated_unique))
+            return [mapping[t] for t in texts]
+
     # 如果列表較小，直接使用 translate_list（也是逐個翻譯）
     if len(texts) <= batch_size * max_workers:
         return translate_list(texts, dest=dest, src=src, batch_size=batch_size)
@@ -370,8 +855,24 @@ def translate_list_parallel(
         batches.append((i, texts[i:i + batch_size]))
     
     # 並行翻譯
-    translated_texts = [None] * len(texts)  # 預分配列表以保持順序
-    
+    bucket = _TokenBucket(rate_per_sec) if rate_per_sec else None
+    in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+
+    def _limited_translate(original_text):
+        """限流包裝：先取令牌（控制速率），再佔在途名額（控制並發）"""
+        if bucket is not None:
+            bucket.acquire()
+        if in_flight is not None:
+            with in_flight:
+                return translate_text(
+                    original_text, dest=dest, src=src, retry_count=2,
+                    translator=_get_thread_translator()
+                )
+        return translate_text(
+            original_text, dest=dest, src=src, retry_count=2,
+            translator=_get_thread_translator()
+        )
+
     def translate_batch(batch_idx, batch_texts):
         """翻譯單個批次（並發執行，每個文本逐個翻譯）"""
         try:
@@ -383,10 +884,13 @@ def translate_list_parallel(
                 else:
                     try:
                         # 使用單個文本翻譯（統一使用逐個翻譯，避免批量翻譯錯誤）
-                        # 在並發環境中，減少重試次數以加快速度，錯誤處理在外部層面進行
-                        result = translate_text(original_text, dest=dest, src=src, retry_count=2)
-                        
-                        if isinstance(result, dict):
+                        # 在並發環境中，減少重試次數以加快速度，錯誤處理在外部層面進行；
+                        # 用線程專屬翻譯器，避免所有線程在全局client裡串行排隊
+                        result = _limited_translate(original_text)
+
+                        # 結果可能是TranslationResult（新鮮翻譯）或dict（緩存命中），
+                        # 兩者都支持.get式取值
+                        if isinstance(result, dict) or hasattr(result, 'text'):
                             translated_text = result.get('text', '') or original_text
                         else:
                             translated_text = original_text
@@ -407,31 +911,104 @@ def translate_list_parallel(
     
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         # 提交所有批次任務
-        future_to_batch = {
-            executor.submit(translate_batch, batch_idx, batch_texts): batch_idx 
+        futures = [
+            executor.submit(translate_batch, batch_idx, batch_texts)
             for batch_idx, batch_texts in batches
-        }
-        
-        # 收集結果
-        completed = 0
-        for future in as_completed(future_to_batch):
+        ]
+
+        # 按提交順序收集：批次本身就是輸入的連續切片，依次展平
+        # 即可復原順序，省掉預分配散射和第二遍None修補兩趟O(n)循環
+        batch_results = []
+        for done, future in enumerate(futures, 1):
             try:
-                batch_idx, translated_batch = future.result()
-                start_idx = batch_idx
-                for i, translated_text in enumerate(translated_batch):
-                    if start_idx + i < len(translated_texts):
-                        translated_texts[start_idx + i] = translated_text
-                completed += 1
-                print(f"翻譯進度: {completed}/{len(batches)} 批次")
+                _, translated_batch = future.result()
             except Exception as e:
                 print(f"⚠ 處理批次結果時出錯: {e}")
-    
-    # 確保所有文本都已翻譯（如果有失敗的，使用原文）
-    for i, text in enumerate(translated_texts):
-        if text is None:
-            translated_texts[i] = texts[i]
-    
-    return translated_texts
+                translated_batch = batches[done - 1][1]  # 原文兜底
+            batch_results.append(translated_batch)
+            print(f"翻譯進度: {done}/{len(batches)} 批次")
+
+    return list(itertools.chain.from_iterable(batch_results))
+
+
+async def _translate_all_async(
+    texts: List[str],
+    dest: str,
+    src: Optional[str],
+    concurrency: int
+) -> List[str]:
+    """事件循環上併發翻譯文本列表（信號量限制在途請求數）"""
+    sem = asyncio.Semaphore(concurrency)
+    translator = get_translator()
+    # 新版googletrans的translate是協程，直接await；舊版同步API則丟給
+    # 默認線程池執行器，事件循環只負責重疊等待
+    native_async = asyncio.iscoroutinefunction(getattr(type(translator), 'translate', None))
+    loop = asyncio.get_running_loop()
+
+    async def _one(original: str) -> str:
+        if not original or not original.strip():
+            return original
+        cached = _cache_get(original, dest, src)
+        if cached is not None:
+            return cached.get('text', original) if isinstance(cached, dict) else cached
+
+        translate_kwargs = {'dest': dest}
+        if src is not None:
+            translate_kwargs['src'] = src
+        async with sem:
+            try:
+                if native_async:
+                    result = await translator.translate(original, **translate_kwargs)
+                else:
+                    result = await loop.run_in_executor(
+                        None,
+                        lambda: _get_thread_translator().translate(original, **translate_kwargs)
+                    )
+            except Exception as e:
+                print(f"⚠ 異步翻譯失敗，返回原文: {e}")
+                return original
+
+        if result is None:
+            return original
+        translated = getattr(result, 'text', original) or original
+        _cache_put(original, dest, src, {
+            'text': translated,
+            'src': getattr(result, 'src', 'auto') or 'auto',
+            'dest': getattr(result, 'dest', dest) or dest,
+            'pronunciation': getattr(result, 'pronunciation', None),
+            'original': original
+        })
+        return translated
+
+    return list(await asyncio.gather(*(_one(t) for t in texts)))
+
+
+def translate_list_async(
+    texts: List[str],
+    dest: str = 'en',
+    src: Optional[str] = None,
+    concurrency: int = 16
+) -> List[str]:
+    """
+    異步併發翻譯文本列表（同步封裝，內部用asyncio.gather）
+
+    線程版每個在途請求佔一個完整線程；事件循環在單線程上復用
+    幾十個待完成請求，上下文切換和每請求內存都低得多
+
+    參數:
+        texts (List[str]): 要翻譯的文本列表
+        dest (str): 目標語言代碼
+        src (str, optional): 源語言代碼
+        concurrency (int): 同時在途的請求數上限
+
+    返回:
+        List[str]: 翻譯後的文本列表（順序與輸入一致）
+    """
+    if not texts:
+        return []
+
+    _validate_dest(dest)
+    return asyncio.run(_translate_all_async(texts, dest, src, concurrency))
 
 
 if __name__ == "__main__":
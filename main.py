@@ -0,0 +1,138 @@
+"""
+BBC新聞搜索示例
+使用Selenium自動化搜索BBC新聞並列出前5條結果
+"""
+import atexit
+import socket
+
+from urllib3 import PoolManager
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+# 搜索框候選選擇器（合併為單一CSS複合選擇器，一次find_elements即可探測全部候選）
+SEARCH_UNION = ",".join([
+    "#search-input",
+    "input[type='search']",
+    "input[name='q']",
+    "input[placeholder*='Search']",
+])
+
+# 搜索結果候選選擇器（同樣合併為單一複合選擇器）
+RESULT_UNION = ",".join([
+    "a[href*='/news/']",
+    "article a",
+    ".ssrcss-its5xf-PromoLink",
+    "[data-testid='internal-link']",
+    "h2 a",
+])
+
+
+def _first_match(driver):
+    """單次find_elements探測所有候選，命中即返回第一個元素（每次輪詢只有一個round-trip）"""
+    elements = driver.find_elements(By.CSS_SELECTOR, SEARCH_UNION)
+    return elements[0] if elements else False
+
+
+# 共享的driver實例：Chrome冷啟動約1-2秒，批量搜索時復用同一瀏覽器進程
+_driver = None
+
+
+def get_driver():
+    """獲取共享的Chrome driver（首次調用啟動，之後直接復用）"""
+    global _driver
+    if _driver is None:
+        # 無頭模式：跳過窗口創建、合成器和GPU初始化；imagesEnabled=false跳過圖片解碼
+        options = webdriver.ChromeOptions()
+        for arg in (
+            "--headless=new",
+            "--disable-gpu",
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--blink-settings=imagesEnabled=false",
+            "--disable-extensions",
+            "--disable-background-networking",
+            "--disable-sync",
+        ):
+            options.add_argument(arg)
+        _driver = webdriver.Chrome(options=options)
+        # 通過CDP屏蔽圖片/字體/媒體和廣告請求：腳本只讀文本和鏈接，
+        # 省下每頁數MB的下載和渲染開銷
+        _driver.execute_cdp_cmd("Network.enable", {})
+        _driver.execute_cdp_cmd("Network.setBlockedURLs", {
+            "urls": [
+                "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp",
+                "*.woff", "*.woff2", "*.mp4",
+                "*/ads/*", "*doubleclick*", "*googletagmanager*",
+            ]
+        })
+        # 每條Selenium命令都是一次HTTP請求：換成更大的keep-alive連接池，
+        # 並開啟TCP_NODELAY避免小JSON載荷被Nagle算法延遲
+        _driver.command_executor._conn = PoolManager(
+            maxsize=16,
+            socket_options=[(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)],
+        )
+        atexit.register(close_driver)
+    return _driver
+
+
+def close_driver():
+    """關閉共享的driver（進程退出時自動調用）"""
+    global _driver
+    if _driver is not None:
+        try:
+            _driver.quit()
+        except Exception:
+            pass
+        _driver = None
+        print("\n✓ 瀏覽器已關閉")
+
+
+def main(query="climate change", driver=None):
+    """搜索BBC新聞並打印前5條結果的標題和鏈接"""
+    if driver is None:
+        driver = get_driver()
+
+    print("正在打開BBC新聞...")
+    driver.get("https://www.bbc.com/search")
+
+    # 等待搜索框出現（複合選擇器一次輪詢覆蓋所有候選，取第一個命中）
+    wait = WebDriverWait(driver, 10)
+    search_box = wait.until(_first_match)
+
+    # 輸入搜索關鍵詞
+    print(f"搜索關鍵詞: {query}")
+    search_box.send_keys(query)
+    search_box.send_keys(Keys.RETURN)
+
+    # 等待搜索結果渲染（事件驅動等待，結果一出現立即返回）
+    wait.until(
+        EC.presence_of_all_elements_located((By.CSS_SELECTOR, RESULT_UNION))
+    )
+
+    # 一次execute_script在頁面內批量讀取標題和鏈接：
+    # 1個round-trip取代每條結果的.text + get_attribute共10個round-trip
+    results = driver.execute_script(
+        "return Array.from(document.querySelectorAll(arguments[0])).slice(0, 5)"
+        ".map(a => ({title: a.textContent.trim(), href: a.href}));",
+        RESULT_UNION,
+    )
+
+    if not results:
+        print("❌ 未找到搜索結果")
+        return
+
+    print(f"\n顯示前 {len(results)} 條結果:")
+    print("=" * 60)
+
+    for i, result in enumerate(results, 1):
+        if result["title"] and result["href"]:
+            print(f"\n{i}. {result['title']}")
+            print(f"   {result['href']}")
+
+
+if __name__ == "__main__":
+    main()
